@@ -1,5 +1,6 @@
 """Application configuration using Pydantic Settings."""
-from functools import lru_cache
+from dataclasses import make_dataclass
+from functools import cached_property, lru_cache
 from pydantic_settings import BaseSettings
 from typing import List, Union
 import json
@@ -23,11 +24,14 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
+    REDIS_MAX_CONNECTIONS: int = 50
     TASK_TTL_SECONDS: int = 86400  # 24 hours
     
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/scraper_api.log"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
    
     
     # Scraping Configuration
@@ -35,12 +39,18 @@ class Settings(BaseSettings):
     MAX_REVIEWS_APPLE: int = 199
     MAX_REVIEWS_GOOGLE: int = 199
     REDDIT_CONCURRENT_LIMIT: int = 5
-    REDDIT_DELAY_MIN: float = 2.0
-    REDDIT_DELAY_MAX: float = 4.0
+    REDDIT_RATE_LIMIT_PER_SECOND: float = 2.0
+    SERPAPI_CONCURRENT_LIMIT: int = 4
+    SCRAPE_CACHE_TTL_SECONDS: int = 3600
+    
+    # Worker Configuration
+    WORKER_MAX_JOBS: int = 10
+    WORKER_JOB_TIMEOUT_SECONDS: int = 1800
     
     # Gemini Configuration
     GEMINI_MODEL: str = "gemini-2.5-flash-lite"
     GEMINI_MAX_TOKENS: int = 200000
+    GEMINI_CONCURRENT_BATCHES: int = 3
     
     # CORS
     CORS_ORIGINS: Union[str, list[str]] = ["*"]
@@ -50,7 +60,9 @@ class Settings(BaseSettings):
         case_sensitive = True
         extra = "ignore"
     
-    def cors_origins_list(self) -> List[str]:
+    @cached_property
+    def cors_origins_parsed(self) -> List[str]:
+        """CORS_ORIGINS parsed once into a list of origins."""
         # allow JSON list string like ["https://..."]
         if isinstance(self.CORS_ORIGINS, list):
             return self.CORS_ORIGINS
@@ -62,7 +74,18 @@ class Settings(BaseSettings):
         except Exception:
             return [x.strip() for x in s.split(",") if x.strip()]
 
-@lru_cache()
-def get_settings() -> Settings:
-    """Get cached settings instance."""
-    return Settings()
+# Immutable plain copy of Settings; attribute reads skip Pydantic's model machinery
+SettingsSnapshot = make_dataclass(
+    "SettingsSnapshot",
+    [(name, field.annotation) for name, field in Settings.model_fields.items()]
+    + [("cors_origins_parsed", List[str])],
+    frozen=True,
+    slots=True,
+)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> SettingsSnapshot:
+    """Get cached settings snapshot."""
+    settings = Settings()
+    return SettingsSnapshot(**settings.model_dump(), cors_origins_parsed=settings.cors_origins_parsed)
@@ -1,24 +1,39 @@
 """WebSocket connection manager with Redis pub/sub."""
-import json
 import asyncio
-from typing import Dict, Set
+from typing import Any, Dict, Set, Tuple
 from fastapi import WebSocket
-from app.core.redis_store import get_redis_store
+from app.core.redis_store import RedisTaskStore
 from app.logging_config import get_logger
 from app.models.responses import TaskStatus, ProgressUpdate
+from app.utils.helpers import json_dumps
 
 
 logger = get_logger(__name__)
 
+# Window in which progress updates for a task are collapsed into the latest one
+PROGRESS_COALESCE_SECONDS = 0.1
+
+# Status values are compared as raw strings on the hot paths
+_STATUS_BY_VALUE: Dict[str, TaskStatus] = {status.value: status for status in TaskStatus}
+_TERMINAL = frozenset({TaskStatus.COMPLETED.value, TaskStatus.FAILED.value})
+
 
 class ConnectionManager:
-    """Manages WebSocket connections with Redis pub/sub for progress updates."""
+    """Manages WebSocket connections with Redis pub/sub for progress updates.
+    
+    One instance is created at startup and kept on `app.state.ws_manager`.
+    """
     
-    def __init__(self):
+    def __init__(self, store: RedisTaskStore):
+        self._store = store
         # Map of task_id -> set of WebSocket connections
         self._connections: Dict[str, Set[WebSocket]] = {}
-        # Map of task_id -> asyncio task for pub/sub listener
-        self._listeners: Dict[str, asyncio.Task] = {}
+        # Map of task_id -> task forwarding its progress queue to the WebSockets
+        self._readers: Dict[str, asyncio.Task] = {}
+        # Map of task_id -> (latest unsent update, scheduled flush)
+        self._pending: Dict[str, Tuple[Dict[str, Any], asyncio.TimerHandle]] = {}
+        # Running flush broadcasts, kept referenced until done
+        self._flush_tasks: Set[asyncio.Task] = set()
     
     async def connect(self, websocket: WebSocket, task_id: str) -> None:
         """Accept WebSocket connection and subscribe to task updates."""
@@ -30,137 +45,162 @@ class ConnectionManager:
         
         logger.info(f"WebSocket connected for task: {task_id}")
         
+        # Subscribe before reading state so no update is missed in between
+        if task_id not in self._readers:
+            queue = await self._store.subscribe_to_progress(task_id)
+            # Another connection may have subscribed, or every client left, meanwhile
+            if task_id in self._readers or task_id not in self._connections:
+                await self._store.unsubscribe_from_progress(task_id, queue)
+            else:
+                self._readers[task_id] = asyncio.create_task(self._forward_updates(task_id, queue))
+        
         # Send current task state immediately
         await self._send_current_state(websocket, task_id)
-        
-        # Start listener if not already running
-        if task_id not in self._listeners or self._listeners[task_id].done():
-            self._listeners[task_id] = asyncio.create_task(
-                self._listen_for_updates(task_id)
-            )
     
     async def disconnect(self, websocket: WebSocket, task_id: str) -> None:
         """Remove WebSocket connection."""
         if task_id in self._connections:
             self._connections[task_id].discard(websocket)
             
-            # Clean up listener if no more connections
             if not self._connections[task_id]:
                 del self._connections[task_id]
-                
-                if task_id in self._listeners:
-                    self._listeners[task_id].cancel()
-                    del self._listeners[task_id]
+                self._cancel_pending(task_id)
+                reader = self._readers.pop(task_id, None)
+                if reader is not None:
+                    reader.cancel()
         
         logger.info(f"WebSocket disconnected for task: {task_id}")
     
+    async def close(self) -> None:
+        """Stop forwarding progress updates and drop pending ones."""
+        for _, handle in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+        
+        readers = list(self._readers.values())
+        self._readers.clear()
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+    
     async def _send_current_state(self, websocket: WebSocket, task_id: str) -> None:
         """Send current task state when client connects."""
         try:
-            store = await get_redis_store()
-            task_data = await store.get_task(task_id)
+            task_data = await self._store.get_task(task_id)
             
-            if task_data:
-                update = ProgressUpdate(
-                    task_id=task_id,
-                    status=TaskStatus(task_data.get("status", "pending")),
-                    progress=int(task_data.get("progress", 0)),
-                    total=100,
-                    message=task_data.get("message", "")
-                )
-                await websocket.send_json(update.model_dump())
-            else:
-                await websocket.send_json({
+            if not task_data:
+                await self._send(websocket, {
                     "task_id": task_id,
                     "error": "Task not found"
                 })
+                return
+            
+            status = task_data.get("status", TaskStatus.PENDING.value)
+            if status in _TERMINAL:
+                # Task finished before the client connected
+                await self._send(websocket, self._final_state_message(task_id, task_data))
+                return
+            
+            update = ProgressUpdate(
+                task_id=task_id,
+                status=_STATUS_BY_VALUE[status],
+                progress=int(task_data.get("progress", 0)),
+                total=100,
+                message=task_data.get("message", "")
+            )
+            await websocket.send_text(update.model_dump_json())
         except Exception as e:
             logger.error(f"Error sending current state: {e}")
-            await websocket.send_json({
+            await self._send(websocket, {
                 "task_id": task_id,
                 "error": str(e)
             })
     
-    async def _listen_for_updates(self, task_id: str) -> None:
-        """Listen for Redis pub/sub messages and broadcast to WebSockets."""
+    async def _send(self, websocket: WebSocket, data: dict) -> None:
+        """Send a JSON message to a single WebSocket."""
+        await websocket.send_text(json_dumps(data))
+    
+    async def _forward_updates(self, task_id: str, queue: asyncio.Queue) -> None:
+        """Forward progress updates routed to a task's queue to its WebSockets."""
         try:
-            store = await get_redis_store()
-            
-            async with store.subscribe_to_progress(task_id) as pubsub:
-                while task_id in self._connections and self._connections[task_id]:
-                    try:
-                        message = await asyncio.wait_for(
-                            pubsub.get_message(ignore_subscribe_messages=True),
-                            timeout=1.0
-                        )
-                        
-                        if message and message.get("type") == "message":
-                            data = message.get("data")
-                            if isinstance(data, str):
-                                await self._broadcast(task_id, json.loads(data))
-                            
-                    except asyncio.TimeoutError:
-                        # Check if task is completed
-                        task_data = await store.get_task(task_id)
-                        if task_data:
-                            status = task_data.get("status")
-                            if status in (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value):
-                                # Send final state and stop listening
-                                await self._broadcast_final_state(task_id, task_data)
-                                break
-                    except asyncio.CancelledError:
-                        break
-                    except Exception as e:
-                        logger.error(f"Error in pub/sub listener: {e}")
-                        await asyncio.sleep(1)
-                        
-        except Exception as e:
-            logger.error(f"Listener error for task {task_id}: {e}")
+            while True:
+                update = await queue.get()
+                
+                if update.get("status") in _TERMINAL:
+                    # Terminal updates already carry error/result_available;
+                    # they supersede any pending update and are never delayed
+                    self._cancel_pending(task_id)
+                    await self._broadcast_raw(task_id, json_dumps(update))
+                    continue
+                
+                self._queue_update(task_id, update)
+        finally:
+            await self._store.unsubscribe_from_progress(task_id, queue)
     
-    async def _broadcast(self, task_id: str, data: dict) -> None:
-        """Broadcast message to all connections for a task."""
-        if task_id not in self._connections:
+    def _queue_update(self, task_id: str, update: Dict[str, Any]) -> None:
+        """Keep the latest update for a task and schedule its broadcast."""
+        pending = self._pending.get(task_id)
+        if pending is not None:
+            self._pending[task_id] = (update, pending[1])
             return
         
-        disconnected = set()
-        
-        for websocket in self._connections[task_id]:
-            try:
-                await websocket.send_json(data)
-            except Exception:
-                disconnected.add(websocket)
+        handle = asyncio.get_running_loop().call_later(
+            PROGRESS_COALESCE_SECONDS, self._flush, task_id
+        )
+        self._pending[task_id] = (update, handle)
+    
+    def _cancel_pending(self, task_id: str) -> None:
+        """Drop the pending update for a task."""
+        pending = self._pending.pop(task_id, None)
+        if pending is not None:
+            pending[1].cancel()
+    
+    def _flush(self, task_id: str) -> None:
+        """Broadcast the latest pending update for a task."""
+        pending = self._pending.pop(task_id, None)
+        if pending is None:
+            return
         
-        # Clean up disconnected sockets
-        for websocket in disconnected:
-            self._connections[task_id].discard(websocket)
+        # Serialized once per flush; superseded updates are never encoded
+        task = asyncio.create_task(self._broadcast_raw(task_id, json_dumps(pending[0])))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
     
-    async def _broadcast_final_state(self, task_id: str, task_data: dict) -> None:
-        """Broadcast final task state with result."""
+    async def _broadcast_raw(self, task_id: str, payload: str) -> None:
+        """Broadcast an already serialized JSON message to all connections for a task."""
         if task_id not in self._connections:
             return
         
-        status = TaskStatus(task_data.get("status"))
+        sockets = list(self._connections[task_id])
+        
+        # Send to every client concurrently; a failed send means the client is gone
+        results = await asyncio.gather(
+            *(websocket.send_text(payload) for websocket in sockets),
+            return_exceptions=True
+        )
         
-        message = {
+        # Clean up disconnected sockets
+        connections = self._connections.get(task_id)
+        if connections is None:
+            return
+        for websocket, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                connections.discard(websocket)
+    
+    def _final_state_message(self, task_id: str, task_data: dict) -> dict:
+        """Build the final state message from the stored hash of a finished task."""
+        status = task_data.get("status")
+        completed = status == TaskStatus.COMPLETED.value
+        
+        return {
             "task_id": task_id,
-            "status": status.value,
-            "progress": 100 if status == TaskStatus.COMPLETED else 0,
+            "status": status,
+            "progress": 100 if completed else 0,
             "total": 100,
-            "message": "Task completed" if status == TaskStatus.COMPLETED else task_data.get("error", "Task failed"),
-            "result_available": task_data.get("result") is not None,
-            "error": task_data.get("error")
+            "message": "Task completed" if completed else (
+                task_data.get("error") or task_data.get("message") or "Task failed"
+            ),
+            "result_available": completed,
+            "error": task_data.get("error") or None
         }
-        
-        await self._broadcast(task_id, message)
-
-
-# Singleton instance
-_manager: ConnectionManager | None = None
-
 
-def get_connection_manager() -> ConnectionManager:
-    """Get connection manager singleton."""
-    global _manager
-    if _manager is None:
-        _manager = ConnectionManager()
-    return _manager
@@ -0,0 +1,214 @@
+"""Shared async HTTP client and per-host request limits for scraping."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import get_settings
+from app.logging_config import get_logger
+from app.utils.helpers import RETRYABLE_STATUS_CODES, backoff_delay
+
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+REDDIT_HOST = "old.reddit.com"
+SERPAPI_HOST = "serpapi.com"
+SERPAPI_SEARCH_URL = f"https://{SERPAPI_HOST}/search.json"
+
+# Maximum concurrent requests per host, shared by every scrape in this process
+DEFAULT_HOST_CONCURRENCY = 10
+HOST_CONCURRENCY: Dict[str, int] = {
+    REDDIT_HOST: settings.REDDIT_CONCURRENT_LIMIT,
+    SERPAPI_HOST: settings.SERPAPI_CONCURRENT_LIMIT,
+}
+
+# Attempts per request when a host keeps answering 429/503
+MAX_RETRY_ATTEMPTS = 5
+
+# Sustained requests per second for hosts with strict rate limits
+HOST_RATE_LIMITS: Dict[str, float] = {
+    REDDIT_HOST: settings.REDDIT_RATE_LIMIT_PER_SECOND,
+}
+
+# Request timeouts per host; connecting gets a shorter budget than reading so
+# an unreachable host fails fast instead of holding a slot for the full timeout
+CONNECT_TIMEOUT_SECONDS = 5.0
+REDDIT_TIMEOUT = httpx.Timeout(10.0, connect=CONNECT_TIMEOUT_SECONDS)
+SERPAPI_TIMEOUT = httpx.Timeout(30.0, connect=CONNECT_TIMEOUT_SECONDS)
+
+# Seconds an idle pooled connection is kept open; long enough that the
+# SerpApi and Reddit connections survive the gaps between a task's requests
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+_client: Optional[httpx.AsyncClient] = None
+_host_admissions: Dict[str, "DynamicAdmission"] = {}
+_host_rate_limiters: Dict[str, "RateLimiter"] = {}
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second with bursts up to `capacity`."""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self._rate = rate
+        self._capacity = max(1.0, capacity if capacity is not None else rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class DynamicAdmission:
+    """Concurrency limit that can be resized while requests are in flight."""
+    
+    def __init__(self, limit: int):
+        self._base = max(1, limit)
+        self._limit = self._base
+        self._active = 0
+        self._cond = asyncio.Condition()
+    
+    @property
+    def limit(self) -> int:
+        """Current number of requests admitted at once."""
+        return self._limit
+    
+    async def acquire(self) -> None:
+        """Wait until a request may start and count it as active."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+    
+    async def release(self) -> None:
+        """Mark an active request finished and admit the next waiter."""
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify(1)
+    
+    async def set_limit(self, limit: int) -> None:
+        """Resize the limit; waiters are admitted at once if it grew."""
+        async with self._cond:
+            self._limit = max(1, limit)
+            self._cond.notify_all()
+    
+    async def back_off(self) -> None:
+        """Halve the limit after the host signals it is overloaded."""
+        await self.set_limit(self._limit // 2)
+    
+    async def recover(self) -> None:
+        """Grow the limit by one after a successful request, up to its configured size."""
+        if self._limit < self._base:
+            await self.set_limit(self._limit + 1)
+    
+    async def __aenter__(self) -> "DynamicAdmission":
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        # Shielded so a cancelled request still gives its slot back
+        await asyncio.shield(self.release())
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            timeout=httpx.Timeout(10.0, connect=CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=50,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("HTTP client closed")
+
+
+def host_admission(host: str) -> DynamicAdmission:
+    """Get the admission controller capping concurrent requests to a host."""
+    admission = _host_admissions.get(host)
+    if admission is None:
+        admission = DynamicAdmission(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+        _host_admissions[host] = admission
+    return admission
+
+
+def host_rate_limiter(host: str) -> Optional[RateLimiter]:
+    """Get the rate limiter for a host, or None if the host is not rate limited."""
+    limiter = _host_rate_limiters.get(host)
+    if limiter is None and host in HOST_RATE_LIMITS:
+        limiter = RateLimiter(HOST_RATE_LIMITS[host])
+        _host_rate_limiters[host] = limiter
+    return limiter
+
+
+@asynccontextmanager
+async def host_slot(host: str):
+    """Hold a concurrency slot for a host, paced by its rate limit if it has one."""
+    async with host_admission(host):
+        limiter = host_rate_limiter(host)
+        if limiter is not None:
+            await limiter.acquire()
+        yield
+
+
+async def get_with_backoff(
+    client: httpx.AsyncClient,
+    host: str,
+    url: str,
+    attempts: int = MAX_RETRY_ATTEMPTS,
+    **kwargs
+) -> httpx.Response:
+    """
+    GET a URL in a host slot, retrying rate-limited responses with backoff.
+    
+    The slot is released while waiting between attempts. The host's
+    concurrency limit is halved on each rate-limited response and grows
+    back one step per successful one. The last response is returned
+    as-is, so callers handle a persistent 429 like any other error status.
+    """
+    admission = host_admission(host)
+    
+    for attempt in range(attempts):
+        async with host_slot(host):
+            response = await client.get(url, **kwargs)
+        
+        if response.status_code not in RETRYABLE_STATUS_CODES:
+            await admission.recover()
+            return response
+        
+        await admission.back_off()
+        if attempt == attempts - 1:
+            return response
+        
+        delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+        logger.warning(
+            f"[HTTP] {host} returned {response.status_code}; "
+            f"retrying in {delay:.1f}s ({attempt + 1}/{attempts})"
+        )
+        await asyncio.sleep(delay)
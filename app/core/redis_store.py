@@ -1,21 +1,87 @@
 """Redis task store for persistent task management."""
-import json
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, Set, Tuple, Union
+from functools import lru_cache
+import zlib
 from datetime import datetime
+import time
+import msgspec
 import redis.asyncio as redis
-from contextlib import asynccontextmanager
+import zstandard
+from pydantic import BaseModel
 
 from app.config import get_settings
 from app.logging_config import get_logger
-from app.models.responses import TaskStatus, ProgressUpdate
+from app.models.responses import TaskStatus
 
 
 logger = get_logger(__name__)
 settings = get_settings()
+_REDIS_URL = settings.REDIS_URL
 
 # TTL for task data (24 hours)
 TASK_TTL_SECONDS = 86400
 
+# Seconds a pooled connection may sit idle before it is pinged on checkout
+REDIS_HEALTH_CHECK_SECONDS = 30
+
+# Window in which non-terminal progress publishes are collected into one pipeline
+PUBLISH_FLUSH_SECONDS = 0.05
+
+# Task hash fields stored as MessagePack blobs; everything else is plain text
+_BLOB_FIELDS = frozenset({"sources", "request", "result"})
+
+# Fields read by status polls
+_STATUS_FIELDS = ("status", "progress", "message", "completed_at", "error")
+
+
+def _encode_model(obj: Any) -> Any:
+    """msgspec hook: encode Pydantic models found anywhere in a blob."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise NotImplementedError(f"Cannot encode {type(obj).__name__}")
+
+
+_msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_encode_model)
+_msgpack_decoder = msgspec.msgpack.Decoder()
+
+# The result blob is additionally zstd-compressed; `result_enc` records how it was stored
+RESULT_ENCODING = "zstd+msgpack"
+_zstd_compressor = zstandard.ZstdCompressor(level=3, threads=0)
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+# Progress is published on a fixed set of shard channels so subscribers
+# use plain SUBSCRIBE instead of pattern matching, and each process only
+# subscribes to the shards of tasks it has viewers for; payloads are a version
+# byte followed by a MessagePack map that carries the task_id for routing
+PROGRESS_SHARDS = 16
+PROGRESS_WIRE_VERSION = b"\x01"
+_PROGRESS_SHARD_CHANNELS = tuple(f"prog.{shard}" for shard in range(PROGRESS_SHARDS))
+
+
+@lru_cache(maxsize=4096)
+def _task_keys(task_id: str) -> Tuple[str, str]:
+    """Get the (hash key, progress shard channel) pair for a task."""
+    return f"t:{task_id}", _PROGRESS_SHARD_CHANNELS[zlib.crc32(task_id.encode()) % PROGRESS_SHARDS]
+
+
+def _encode_progress(update: Dict[str, Any]) -> bytes:
+    """Encode a progress update (ProgressUpdate fields) for the pub/sub wire."""
+    return PROGRESS_WIRE_VERSION + _msgpack_encoder.encode(update)
+
+
+# Atomically store status fields, refresh the TTL and publish (when a payload
+# is given) in one command.
+# KEYS: task hash, progress channel; ARGV: ttl, payload, field, value, ...
+_WRITE_STATUS_LUA = """
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+if ARGV[2] ~= '' then
+    redis.call('PUBLISH', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
 
 class RedisTaskStore:
     """Async Redis client for task storage and pub/sub."""
@@ -23,9 +89,23 @@ class RedisTaskStore:
     _instance: Optional["RedisTaskStore"] = None
     
     def __init__(self):
+        # One binary pool serves commands and pub/sub; text fields are decoded where read
         self._pool: Optional[redis.ConnectionPool] = None
         self._client: Optional[redis.Redis] = None
-        self._pubsub_client: Optional[redis.Redis] = None
+        # Map of task_id -> queues receiving its progress payloads
+        self._router: Dict[str, Set[asyncio.Queue]] = {}
+        self._dispatcher_task: Optional[asyncio.Task] = None
+        # Map of shard channel -> registered queues whose task hashes to it;
+        # a shard is subscribed exactly while its count is above zero
+        self._shard_refs: Dict[str, int] = {}
+        self._pubsub: Optional[redis.client.PubSub] = None
+        # Serializes SUBSCRIBE/UNSUBSCRIBE with the dispatcher's (re)subscription
+        self._subscription_lock = asyncio.Lock()
+        # Map of task_id -> latest unpublished progress payload
+        self._pub_buffer: Dict[str, bytes] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # Held while publishing so a final state never overtakes an in-flight batch
+        self._publish_lock = asyncio.Lock()
     
     @classmethod
     async def get_instance(cls) -> "RedisTaskStore":
@@ -39,12 +119,15 @@ class RedisTaskStore:
         """Initialize Redis connection pool."""
         try:
             self._pool = redis.ConnectionPool.from_url(
-                settings.REDIS_URL,
-                max_connections=10,
-                decode_responses=True
+                _REDIS_URL,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                health_check_interval=REDIS_HEALTH_CHECK_SECONDS,
+                socket_keepalive=True
             )
+            # Pub/sub takes its own connection from this pool
             self._client = redis.Redis(connection_pool=self._pool)
-            self._pubsub_client = redis.Redis(connection_pool=self._pool)
+            # Runs via EVALSHA, loading the script on first use
+            self._write_status_script = self._client.register_script(_WRITE_STATUS_LUA)
             
             # Test connection
             await self._client.ping()
@@ -55,10 +138,22 @@ class RedisTaskStore:
     
     async def disconnect(self) -> None:
         """Close Redis connections."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._flush_publishes()
+        
+        if self._dispatcher_task is not None:
+            self._dispatcher_task.cancel()
+            try:
+                await self._dispatcher_task
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher_task = None
+        await self._close_pubsub()
+        
         if self._client:
             await self._client.aclose()
-        if self._pubsub_client:
-            await self._pubsub_client.aclose()
         if self._pool:
             await self._pool.disconnect()
         logger.info("Redis connection closed")
@@ -75,11 +170,11 @@ class RedisTaskStore:
     
     def _task_key(self, task_id: str) -> str:
         """Get Redis key for task data."""
-        return f"task:{task_id}"
+        return _task_keys(task_id)[0]
     
     def _progress_channel(self, task_id: str) -> str:
-        """Get Redis channel for progress updates."""
-        return f"progress:{task_id}"
+        """Get the shard channel carrying a task's progress updates."""
+        return _task_keys(task_id)[1]
     
     async def create_task(self, task_id: str, initial_data: Dict[str, Any]) -> None:
         """Create a new task in Redis."""
@@ -92,34 +187,54 @@ class RedisTaskStore:
             "message": "Task created",
             "created_at": datetime.utcnow().isoformat(),
             "completed_at": "",
-            "sources": json.dumps(initial_data.get("sources", [])),
-            "request": json.dumps(initial_data.get("request", {})),
+            "sources": _msgpack_encoder.encode(initial_data.get("sources", [])),
+            "request": _msgpack_encoder.encode(initial_data.get("request", {})),
             "result": "",
             "error": ""
         }
         
-        await self._client.hset(key, mapping=task_data)
-        await self._client.expire(key, TASK_TTL_SECONDS)
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=task_data)
+            pipe.expire(key, TASK_TTL_SECONDS)
+            await pipe.execute()
         logger.debug(f"Created task: {task_id}")
     
     async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get task data from Redis."""
         key = self._task_key(task_id)
-        data = await self._client.hgetall(key)
+        raw = await self._client.hgetall(key)
         
-        if not data:
+        if not raw:
             return None
         
-        # Deserialize JSON fields
-        if data.get("sources"):
-            data["sources"] = json.loads(data["sources"])
-        if data.get("request"):
-            data["request"] = json.loads(data["request"])
-        if data.get("result"):
-            data["result"] = json.loads(data["result"])
+        if raw.get(b"result") and raw.get(b"result_enc", b"").decode() == RESULT_ENCODING:
+            raw[b"result"] = _zstd_decompressor.decompress(raw[b"result"])
+        
+        # Decode MessagePack fields; the rest are UTF-8 text
+        data: Dict[str, Any] = {}
+        for field, value in raw.items():
+            field = field.decode()
+            if field in _BLOB_FIELDS:
+                data[field] = _msgpack_decoder.decode(value) if value else ""
+            else:
+                data[field] = value.decode()
         
         return data
     
+    async def get_task_status(self, task_id: str) -> Optional[Dict[str, str]]:
+        """Get only the small status fields of a task, skipping its blobs."""
+        key = self._task_key(task_id)
+        values = await self._client.hmget(key, _STATUS_FIELDS)
+        
+        # Every task hash has a status; a missing one means no such task
+        if values[0] is None:
+            return None
+        
+        return {
+            field: value.decode() if value else ""
+            for field, value in zip(_STATUS_FIELDS, values)
+        }
+    
     async def update_task_status(
         self, 
         task_id: str, 
@@ -127,8 +242,8 @@ class RedisTaskStore:
         progress: int = 0,
         message: str = ""
     ) -> None:
-        """Update task status and publish progress."""
-        key = self._task_key(task_id)
+        """Update task status, refresh its TTL and publish progress."""
+        key, channel = _task_keys(task_id)
         
         updates = {
             "status": status.value,
@@ -136,66 +251,216 @@ class RedisTaskStore:
             "message": message
         }
         
-        if status == TaskStatus.COMPLETED or status == TaskStatus.FAILED:
+        # Same fields as ProgressUpdate, built directly to skip model validation
+        progress_update = {
+            "task_id": task_id,
+            "status": status.value,
+            "progress": progress,
+            "total": 100,
+            "message": message,
+            "timestamp": time.time()
+        }
+        
+        terminal = status == TaskStatus.COMPLETED or status == TaskStatus.FAILED
+        if terminal:
             updates["completed_at"] = datetime.utcnow().isoformat()
+            # Terminal payloads carry everything listeners need for the final state
+            progress_update["result_available"] = status == TaskStatus.COMPLETED
         
-        await self._client.hset(key, mapping=updates)
+        payload = _encode_progress(progress_update)
         
-        # Publish progress update
-        progress_update = ProgressUpdate(
-            task_id=task_id,
-            status=status,
-            progress=progress,
-            total=100,
-            message=message
-        )
+        if not terminal:
+            await self._write_status(key, channel, updates)
+            self._buffer_publish(task_id, payload)
+        else:
+            # Final state supersedes any buffered update and is published right away
+            async with self._publish_lock:
+                self._pub_buffer.pop(task_id, None)
+                await self._write_status(key, channel, updates, payload)
         
-        await self._publish_progress(task_id, progress_update)
         logger.debug(f"Task {task_id}: {status.value} - {progress}% - {message}")
     
-    async def set_task_result(self, task_id: str, result: Dict[str, Any]) -> None:
-        """Store task result."""
+    async def set_task_result(self, task_id: str, result: Union[BaseModel, Dict[str, Any]]) -> None:
+        """Store task result, encoding a model or dict straight to compressed MessagePack."""
         key = self._task_key(task_id)
-        await self._client.hset(key, "result", json.dumps(result))
+        await self._client.hset(key, mapping={
+            "result": _zstd_compressor.compress(_msgpack_encoder.encode(result)),
+            "result_enc": RESULT_ENCODING
+        })
         logger.debug(f"Stored result for task: {task_id}")
     
     async def set_task_error(self, task_id: str, error: str) -> None:
         """Store task error."""
-        key = self._task_key(task_id)
-        await self._client.hset(key, mapping={
+        key, channel = _task_keys(task_id)
+        progress_update = {
+            "task_id": task_id,
             "status": TaskStatus.FAILED.value,
+            "progress": 0,
+            "total": 100,
+            "message": f"Error: {error}",
+            "timestamp": time.time(),
             "error": error,
-            "completed_at": datetime.utcnow().isoformat()
-        })
+            "result_available": False
+        }
         
-        # Publish error update
-        progress_update = ProgressUpdate(
-            task_id=task_id,
-            status=TaskStatus.FAILED,
-            progress=0,
-            total=100,
-            message=f"Error: {error}"
-        )
-        await self._publish_progress(task_id, progress_update)
+        # Store error and publish the final update in a single command
+        async with self._publish_lock:
+            self._pub_buffer.pop(task_id, None)
+            await self._write_status(key, channel, {
+                "status": TaskStatus.FAILED.value,
+                "error": error,
+                "completed_at": datetime.utcnow().isoformat()
+            }, _encode_progress(progress_update))
         logger.error(f"Task {task_id} failed: {error}")
     
-    async def _publish_progress(self, task_id: str, update: ProgressUpdate) -> None:
-        """Publish progress update to Redis channel."""
-        channel = self._progress_channel(task_id)
-        await self._client.publish(channel, update.model_dump_json())
+    async def _write_status(
+        self,
+        key: str,
+        channel: str,
+        fields: Dict[str, Any],
+        payload: bytes = b""
+    ) -> None:
+        """Store status fields, refresh the TTL and optionally publish, atomically."""
+        args: list = [TASK_TTL_SECONDS, payload]
+        for field, value in fields.items():
+            args.extend((field, value))
+        await self._write_status_script(keys=[key, channel], args=args)
+    
+    def _buffer_publish(self, task_id: str, payload: bytes) -> None:
+        """Keep the latest progress payload for a task and schedule a batched publish."""
+        self._pub_buffer[task_id] = payload
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_delay())
+    
+    async def _flush_after_delay(self) -> None:
+        """Publish buffered progress after the flush window."""
+        await asyncio.sleep(PUBLISH_FLUSH_SECONDS)
+        try:
+            await self._flush_publishes()
+        except Exception as e:
+            logger.error(f"Failed to publish buffered progress: {e}")
+    
+    async def _flush_publishes(self) -> None:
+        """Publish every buffered progress payload in one pipeline."""
+        async with self._publish_lock:
+            if not self._pub_buffer or self._client is None:
+                return
+            
+            buffered, self._pub_buffer = self._pub_buffer, {}
+            async with self._client.pipeline(transaction=False) as pipe:
+                for task_id, payload in buffered.items():
+                    pipe.publish(self._progress_channel(task_id), payload)
+                await pipe.execute()
     
-    @asynccontextmanager
-    async def subscribe_to_progress(self, task_id: str):
-        """Subscribe to task progress updates."""
+    async def subscribe_to_progress(self, task_id: str) -> asyncio.Queue:
+        """Register a queue that receives the decoded progress updates of a task."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._router.setdefault(task_id, set()).add(queue)
+        
         channel = self._progress_channel(task_id)
-        pubsub = self._pubsub_client.pubsub()
+        async with self._subscription_lock:
+            self._shard_refs[channel] = self._shard_refs.get(channel, 0) + 1
+            
+            # One subscription per process feeds every registered queue; a
+            # starting dispatcher subscribes to all counted shards itself
+            if self._dispatcher_task is None:
+                self._dispatcher_task = asyncio.create_task(self._dispatch_progress())
+            elif self._shard_refs[channel] == 1 and self._pubsub is not None:
+                try:
+                    await self._pubsub.subscribe(channel)
+                except Exception as e:
+                    # The dispatcher resubscribes every counted shard when it reconnects
+                    logger.warning(f"Failed to subscribe to {channel}: {e}")
+        return queue
+    
+    async def unsubscribe_from_progress(self, task_id: str, queue: asyncio.Queue) -> None:
+        """Stop delivering progress updates of a task to a queue."""
+        queues = self._router.get(task_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._router[task_id]
         
-        try:
-            await pubsub.subscribe(channel)
-            yield pubsub
-        finally:
-            await pubsub.unsubscribe(channel)
-            await pubsub.aclose()
+        channel = self._progress_channel(task_id)
+        async with self._subscription_lock:
+            self._shard_refs[channel] -= 1
+            if self._shard_refs[channel] > 0:
+                return
+            del self._shard_refs[channel]
+            
+            if self._pubsub is not None:
+                try:
+                    await self._pubsub.unsubscribe(channel)
+                except Exception as e:
+                    logger.warning(f"Failed to unsubscribe from {channel}: {e}")
+    
+    async def _close_pubsub(self) -> None:
+        """Close the progress subscription connection, if open."""
+        if self._pubsub is not None:
+            pubsub, self._pubsub = self._pubsub, None
+            try:
+                await pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close progress subscription: {e}")
+    
+    async def _dispatch_progress(self) -> None:
+        """Decode each published progress payload once and route it to its task's queues."""
+        while True:
+            try:
+                async with self._subscription_lock:
+                    await self._close_pubsub()
+                    # Stop once no shard is wanted; the next subscriber starts a new dispatcher
+                    if not self._shard_refs:
+                        self._dispatcher_task = None
+                        return
+                    self._pubsub = self._client.pubsub()
+                    await self._pubsub.subscribe(*self._shard_refs)
+                
+                # listen() ends when the last shard has been unsubscribed
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    
+                    data = message.get("data")
+                    if not isinstance(data, bytes) or data[:1] != PROGRESS_WIRE_VERSION:
+                        continue
+                    
+                    try:
+                        update = _msgpack_decoder.decode(data[1:])
+                    except msgspec.DecodeError as e:
+                        logger.error(f"Invalid progress payload: {e}")
+                        continue
+                    
+                    # Other tasks on the same shard may have no viewers in this process
+                    queues = self._router.get(update.get("task_id"))
+                    if not queues:
+                        continue
+                    
+                    for queue in queues:
+                        queue.put_nowait(update)
+                        
+            except asyncio.CancelledError:
+                logger.debug("Progress dispatcher cancelled")
+                raise
+            except Exception as e:
+                logger.error(f"Progress dispatcher error, resubscribing: {e}")
+                await asyncio.sleep(1)
+    
+    async def get_cached(self, key: str) -> Optional[Any]:
+        """Get a value stored with set_cached, or None if missing or expired."""
+        value = await self._client.get(key)
+        if value is None:
+            return None
+        return _msgpack_decoder.decode(_zstd_decompressor.decompress(value))
+    
+    async def set_cached(self, key: str, value: Any, ttl_seconds: int) -> None:
+        """Store a value as compressed MessagePack that expires after ttl_seconds."""
+        await self._client.set(
+            key,
+            _zstd_compressor.compress(_msgpack_encoder.encode(value)),
+            ex=ttl_seconds
+        )
     
     async def delete_task(self, task_id: str) -> bool:
         """Delete a task from Redis."""
@@ -205,6 +470,8 @@ class RedisTaskStore:
 
 
 # Convenience functions
-async def get_redis_store() -> RedisTaskStore:
-    """Dependency injection for Redis store."""
-    return await RedisTaskStore.get_instance()
+def get_redis_store() -> RedisTaskStore:
+    """Get the process-wide Redis store created at startup."""
+    if RedisTaskStore._instance is None:
+        raise RuntimeError("Redis store is not initialized; call RedisTaskStore.get_instance() at startup")
+    return RedisTaskStore._instance
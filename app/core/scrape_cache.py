@@ -0,0 +1,71 @@
+"""Redis-backed cache for scraper results shared by API and worker processes."""
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config import get_settings
+from app.core.redis_store import RedisTaskStore
+from app.logging_config import get_logger
+
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Arguments that do not change what a scraper returns
+_IGNORED_ARGS = frozenset({"client"})
+
+
+def _store() -> Optional[RedisTaskStore]:
+    """Get the process-wide Redis store, or None before it is connected."""
+    return RedisTaskStore._instance
+
+
+def cached_scrape(namespace: str, ttl_seconds: Optional[int] = None):
+    """
+    Cache a scraper's result tuple in Redis, keyed by its arguments.
+    
+    Only results with a non-zero trailing count are cached, so failed or
+    empty scrapes are retried on the next call. Cache errors never fail
+    the scrape itself.
+    
+    Args:
+        namespace: Key namespace, e.g. "apple"
+        ttl_seconds: Cache lifetime (defaults to SCRAPE_CACHE_TTL_SECONDS)
+    """
+    ttl = ttl_seconds or settings.SCRAPE_CACHE_TTL_SECONDS
+    
+    def decorator(func: Callable[..., Awaitable[tuple]]) -> Callable[..., Awaitable[tuple]]:
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> tuple:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = ":".join(
+                ["serpapi_cache", namespace]
+                + [str(value) for name, value in bound.arguments.items() if name not in _IGNORED_ARGS]
+            )
+            
+            store = _store()
+            if store is not None:
+                try:
+                    cached = await store.get_cached(key)
+                    if cached is not None:
+                        logger.info(f"[Cache] Hit for {key}")
+                        return tuple(cached)
+                except Exception as e:
+                    logger.warning(f"[Cache] Read failed for {key}: {e}")
+            
+            result = await func(*args, **kwargs)
+            
+            if store is not None and result and result[-1]:
+                try:
+                    await store.set_cached(key, result, ttl)
+                except Exception as e:
+                    logger.warning(f"[Cache] Write failed for {key}: {e}")
+            
+            return result
+        
+        return wrapper
+    
+    return decorator
@@ -0,0 +1,47 @@
+"""arq job queue for handing scrape tasks to worker processes."""
+from typing import Optional
+
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
+
+from app.config import get_settings
+from app.logging_config import get_logger
+
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Name of the worker function that runs a scrape task (see app/worker.py)
+SCRAPE_JOB = "run_scrape_task"
+
+_pool: Optional[ArqRedis] = None
+
+
+def get_redis_settings() -> RedisSettings:
+    """Get arq connection settings for the configured Redis."""
+    return RedisSettings.from_dsn(settings.REDIS_URL)
+
+
+async def connect_task_queue() -> ArqRedis:
+    """Create the arq connection pool used to enqueue jobs."""
+    global _pool
+    if _pool is None:
+        _pool = await create_pool(get_redis_settings())
+        logger.info("Task queue connection established")
+    return _pool
+
+
+def get_task_queue() -> ArqRedis:
+    """Get the arq connection pool created at startup."""
+    if _pool is None:
+        raise RuntimeError("Task queue is not initialized; call connect_task_queue() at startup")
+    return _pool
+
+
+async def close_task_queue() -> None:
+    """Close the arq connection pool."""
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
+        logger.info("Task queue connection closed")
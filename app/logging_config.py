@@ -1,12 +1,23 @@
 """Logging configuration with file rotation."""
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 from app.config import get_settings
 
 
+# Background thread that writes queued records to the real handlers
+_queue_listener: Optional[QueueListener] = None
+
+
 def setup_logging() -> logging.Logger:
-    """Configure application logging with file rotation and console output."""
+    """Configure application logging with file rotation and console output.
+    
+    Records are put on a queue and written by a background listener, so
+    logging from async handlers never blocks on disk I/O or file rollover.
+    """
+    global _queue_listener
     settings = get_settings()
     
     # Create logs directory
@@ -26,6 +37,12 @@ def setup_logging() -> logging.Logger:
     
     # Clear existing handlers
     logger.handlers = []
+    stop_logging()
+    
+    # Console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
     
     # File handler with rotation
     try:
@@ -37,13 +54,26 @@ def setup_logging() -> logging.Logger:
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
         logger.warning(f"Could not set up file logging: {e}")
     
+    log_queue: queue.Queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+    
     return logger
 
 
+def stop_logging() -> None:
+    """Flush queued log records and stop the background listener."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 def get_logger(name: str = "scraper_api") -> logging.Logger:
     """Get a logger instance."""
     return logging.getLogger(name)
@@ -3,10 +3,13 @@ from contextlib import asynccontextmanager
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.config import get_settings
-from app.logging_config import setup_logging, get_logger
-from app.core.redis_store import RedisTaskStore
+from app.logging_config import setup_logging, stop_logging, get_logger
+from app.core.redis_store import RedisTaskStore, get_redis_store
+from app.core.connection_manager import ConnectionManager
+from app.core.task_queue import connect_task_queue, close_task_queue
 from app.api.v1.endpoints import scraper
 
 
@@ -23,23 +26,36 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Multi-Source Scraper API...")
     
     try:
-        # Initialize Redis connection
+        # Initialize the shared Redis connection pool
         await RedisTaskStore.get_instance()
         logger.info("Redis connection established")
     except Exception as e:
         logger.error(f"Failed to connect to Redis: {e}")
         logger.warning("Application will start but task persistence will not work")
     
+    app.state.redis_store = get_redis_store()
+    app.state.ws_manager = ConnectionManager(app.state.redis_store)
+    
+    try:
+        # Scrape tasks run in arq worker processes
+        await connect_task_queue()
+    except Exception as e:
+        logger.error(f"Failed to connect task queue: {e}")
+        logger.warning("Application will start but scrape tasks cannot be queued")
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Multi-Source Scraper API...")
     
     try:
-        store = await RedisTaskStore.get_instance()
-        await store.disconnect()
+        await app.state.ws_manager.close()
+        await close_task_queue()
+        await app.state.redis_store.disconnect()
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
+    
+    stop_logging()
 
 
 def create_app() -> FastAPI:
@@ -87,6 +103,7 @@ The AI categorizes findings into 7 types:
         docs_url="/docs",
         redoc_url="/redoc",
         openapi_url="/openapi.json",
+        default_response_class=ORJSONResponse,
         lifespan=lifespan
     )
 
@@ -100,7 +117,7 @@ The AI categorizes findings into 7 types:
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=settings.cors_origins_list(),  # Configure appropriately for production
+        allow_origins=settings.cors_origins_parsed,  # Configure appropriately for production
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
@@ -129,7 +146,7 @@ The AI categorizes findings into 7 types:
         redis_connected = False
         
         try:
-            store = await RedisTaskStore.get_instance()
+            store = get_redis_store()
             redis_connected = await store.is_connected()
         except Exception as exc:
             logger.warning(f"Health check: failed to verify Redis connectivity: {exc}")
@@ -2,6 +2,7 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
+import time
 from pydantic import BaseModel, Field
 
 
@@ -20,12 +21,11 @@ class ProgressUpdate(BaseModel):
     progress: int = Field(ge=0, le=100)
     total: int = 100
     message: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    # Unix epoch seconds
+    timestamp: float = Field(default_factory=time.time)
+    # Only set on terminal updates
+    error: Optional[str] = None
+    result_available: Optional[bool] = None
 
 
 class ScrapeStartResponse(BaseModel):
@@ -1,67 +1,151 @@
 """Apple App Store scraper service."""
-from serpapi import GoogleSearch
+import asyncio
+from typing import Any, Dict, Optional
+
+import httpx
 
 from app.config import get_settings
+from app.core.http_client import SERPAPI_HOST, SERPAPI_SEARCH_URL, SERPAPI_TIMEOUT, get_http_client, host_slot
+from app.core.scrape_cache import cached_scrape
 from app.logging_config import get_logger
+from app.utils.helpers import json_loads
 
 
 logger = get_logger(__name__)
 settings = get_settings()
+_SERPAPI_KEY = settings.SERPAPI_KEY
+
+# Pages requested concurrently per burst
+APPLE_PAGE_BURST = 5
+
+# Reviews per page assumed when sizing the first burst, before any page is seen
+APPLE_REVIEWS_PER_PAGE_ESTIMATE = 10
+
+# Stop paginating once a page is mostly reviews already seen on earlier pages
+MIN_NOVEL_REVIEW_RATIO = 0.2
 
 
+async def _fetch_reviews_page(
+    client: httpx.AsyncClient,
+    product_id: str,
+    country: str,
+    page: int
+) -> Dict[str, Any]:
+    """Fetch one page of Apple App Store reviews from SerpApi."""
+    params = {
+        "engine": "apple_reviews",
+        "product_id": product_id,
+        "country": country,
+        "page": page,
+        "json_restrictor": "reviews[].{title, text, rating, review_date, reviewed_version}, serpapi_pagination",
+        "api_key": _SERPAPI_KEY
+    }
+    
+    logger.debug(f"[Apple App Store] Requesting page {page} for product {product_id}")
+    
+    async with host_slot(SERPAPI_HOST):
+        response = await client.get(SERPAPI_SEARCH_URL, params=params, timeout=SERPAPI_TIMEOUT)
+    response.raise_for_status()
+    return json_loads(response.content)
+
+
+@cached_scrape("apple")
 async def scrape_apple_store_reviews(
     product_id: str, 
     country: str = "us", 
-    target_reviews: int = 199
+    target_reviews: int = 199,
+    client: Optional[httpx.AsyncClient] = None
 ) -> tuple:
     """
     Scrape Apple App Store reviews.
     
+    Pages are fetched in concurrent bursts; each burst is sized from the
+    reviews still needed so few pages are requested past the target. A
+    page that fails or comes back empty ends pagination, keeping the
+    reviews from the pages before it.
+    
     Args:
         product_id: Apple App Store product ID (e.g., 544007664)
         country: Country code (e.g., us, gb, ca)
         target_reviews: Target number of reviews to fetch (default: 199)
+        client: Shared HTTP client (defaults to the process-wide client)
     
     Returns:
         tuple: (source, product_id, country, reviews_json, total_reviews)
     """
     logger.info(f"[Apple App Store] Starting scrape for product: {product_id}, country: {country}")
 
+    client = client or get_http_client()
     all_reviews = []
+    seen = set()
     page = 1
+    burst = max(1, min(APPLE_PAGE_BURST, -(-target_reviews // APPLE_REVIEWS_PER_PAGE_ESTIMATE)))
     
     try:
         while len(all_reviews) < target_reviews:
-            params = {
-                "engine": "apple_reviews",
-                "product_id": product_id,
-                "country": country,
-                "page": page,
-                "json_restrictor": "reviews[].{title, text, rating, review_date, reviewed_version}, serpapi_pagination",
-                "api_key": settings.SERPAPI_KEY
-            }
+            pages = range(page, page + burst)
+            responses = await asyncio.gather(
+                *(_fetch_reviews_page(client, product_id, country, p) for p in pages),
+                return_exceptions=True
+            )
             
-            logger.debug(f"[Apple App Store] Requesting page {page} for product {product_id}")
-
-            search = GoogleSearch(params)
-            results = search.get_dict()
+            # The first failed or empty page ends pagination; earlier pages are kept
+            has_more = True
+            for current_page, results in zip(pages, responses):
+                if isinstance(results, Exception):
+                    logger.warning(f"[Apple App Store] Failed to fetch page {current_page}: {results}. Ending search.")
+                    has_more = False
+                    break
+                
+                reviews = results.get("reviews", [])
+                if not reviews:
+                    logger.warning(f"[Apple App Store] No reviews found on page {current_page}. Ending search.")
+                    has_more = False
+                    break
+                
+                # SerpApi occasionally repeats reviews across pages
+                novel = 0
+                for review in reviews:
+                    if len(all_reviews) >= target_reviews:
+                        break
+                    # Date and rating keep short identical reviews by different users apart
+                    review_hash = hash((
+                        review.get("title", ""),
+                        (review.get("text") or "")[:64],
+                        review.get("review_date", ""),
+                        review.get("rating")
+                    ))
+                    if review_hash in seen:
+                        continue
+                    seen.add(review_hash)
+                    all_reviews.append(review)
+                    novel += 1
+                logger.info(f"[Apple App Store] Fetched page {current_page}... Total reviews so far: {len(all_reviews)}")
+                
+                if len(all_reviews) >= target_reviews:
+                    has_more = False
+                    break
+                
+                if novel < MIN_NOVEL_REVIEW_RATIO * len(reviews):
+                    logger.info(f"[Apple App Store] Page {current_page} was mostly duplicates. Ending search.")
+                    has_more = False
+                    break
+                
+                serpapi_pagination = results.get("serpapi_pagination", {})
+                if "next" not in serpapi_pagination:
+                    logger.info("[Apple App Store] No more pages available.")
+                    has_more = False
+                    break
             
-            reviews = results.get("reviews", [])
-            if not reviews:
-                logger.warning(f"[Apple App Store] No reviews found on page {page}. Ending search.")
+            if not has_more:
                 break
             
-            all_reviews.extend(reviews)
-            logger.info(f"[Apple App Store] Fetched page {page}... Total reviews so far: {len(all_reviews)}")
+            page += burst
             
-            serpapi_pagination = results.get("serpapi_pagination", {})
-            if "next" not in serpapi_pagination:
-                logger.info("[Apple App Store] No more pages available.")
-                break
-            
-            page += 1
-        
-        all_reviews = all_reviews[:target_reviews]
+            # Size the next burst from the average page size seen so far
+            per_page = max(1, len(all_reviews) // (page - 1))
+            remaining = target_reviews - len(all_reviews)
+            burst = max(1, min(APPLE_PAGE_BURST, -(-remaining // per_page)))
         
         logger.info(f"[Apple App Store] Successfully completed. Total fetched: {len(all_reviews)}")
 
@@ -1,85 +1,181 @@
 """Data processing utilities - TOON format conversion."""
+import csv
+import heapq
+import io
 import json
-from typing import List, Dict, Any
+import statistics
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List
 
 from app.logging_config import get_logger
-from app.utils.helpers import sanitize_pipe_text
+from app.utils.helpers import json_dumps, json_loads, sanitize_pipe_column
 
 
 logger = get_logger(__name__)
 
+# Quotes and backslashes stripped from parsed finding text
+_FINDING_TEXT_TABLE = str.maketrans("", "", "\"\\")
 
-def convert_reviews_to_toon(reviews: list, source_type: str) -> str:
+# Scraped items as passed to the TOON formatters; fully typed so the
+# formatters can be compiled with mypyc without changes
+Rows = List[Dict[str, Any]]
+
+# Sources whose reviews carry a star rating
+_RATED_SOURCES = frozenset({"google_play_store", "apple_app_store"})
+
+# Priority action rules, applied in order: finding type, optional filter,
+# how many top findings (by priority score) to take, action and reason
+# templates formatted with the finding, expected impact, effort required
+_PRIORITY_ACTION_RULES = (
+    ("bug", lambda f: f["severity"] == "critical", 3,
+     "Fix critical bug: {title}", "Critical severity with {frequency} mentions", "high", "high"),
+    ("requirement", None, 2,
+     "Implement required feature: {title}", "Expected by users ({frequency} mentions)", "high", "medium"),
+    ("usability_friction", None, 2,
+     "Fix UX issue: {title}", "Causes user frustration ({frequency} mentions)", "medium", "low"),
+)
+
+# Column names that identify the TOON header line in a Gemini response
+_HEADER_KEYS = ("type", "category", "title")
+
+
+def _embed_json(value: Any) -> str:
+    """Serialize a nested value for a TOON cell, falling back to stdlib json for types orjson rejects."""
+    try:
+        return json_dumps(value)
+    except TypeError:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _embed_optional(value: Any) -> str:
+    """Serialize an optional nested value for a TOON cell; absent or empty values give an empty cell."""
+    return _embed_json(value) if value else ""
+
+
+def is_toon_header(line: str) -> bool:
+    """Check whether a line is the TOON findings header (type | category | title ...)."""
+    low = line.lower()
+    return all(key in low for key in _HEADER_KEYS)
+
+
+def _clean_finding_text(text: str) -> str:
+    """Restore escaped pipes and strip quotes/backslashes from a finding field."""
+    return text.replace("[PIPE]", "|").translate(_FINDING_TEXT_TABLE).strip()
+
+
+def _text_column(items: Rows, key: str) -> List[str]:
+    """Sanitize one text field across all items as a single column."""
+    return sanitize_pipe_column([str(item.get(key, "")) for item in items])
+
+
+def _toon_google_play(reviews: Rows) -> Iterator[str]:
+    """Yield TOON lines for Google Play reviews."""
+    yield "rating | snippet | likes | iso_date"
+    yield from (
+        f"{r.get('rating', '')} | {snippet} | {r.get('likes', '')} | {r.get('iso_date', '')}"
+        for r, snippet in zip(reviews, _text_column(reviews, "snippet"))
+    )
+
+
+def _toon_apple(reviews: Rows) -> Iterator[str]:
+    """Yield TOON lines for Apple App Store reviews."""
+    yield "title | text | rating | review_date | reviewed_version"
+    yield from (
+        f"{title} | {text} | {r.get('rating', '')} | {r.get('review_date', '')} | {r.get('reviewed_version', '')}"
+        for r, title, text in zip(reviews, _text_column(reviews, "title"), _text_column(reviews, "text"))
+    )
+
+
+def _toon_reddit(posts: Rows) -> Iterator[str]:
+    """Yield TOON lines for Reddit posts."""
+    yield "title | posted | comment_count_stat | body_text | comments_text"
+    
+    # Only the text field of each comment is included; all comments are
+    # sanitized as one column and regrouped per post
+    comment_lists: List[Rows] = [post.get("comments_content", []) for post in posts]
+    comment_texts = iter(_text_column([c for comments in comment_lists for c in comments], "text"))
+    comments_combined = [
+        " | ".join(next(comment_texts) for _ in comments) for comments in comment_lists
+    ]
+    
+    yield from (
+        f"{title} | {posted} | {comment_count} | {body_text} | {comments}"
+        for title, posted, comment_count, body_text, comments in zip(
+            _text_column(posts, "title"),
+            _text_column(posts, "posted"),
+            _text_column(posts, "comment_count_stat"),
+            _text_column(posts, "body_text"),
+            comments_combined
+        )
+    )
+
+
+def _toon_google_search(results: Rows) -> Iterator[str]:
+    """Yield TOON lines for Google Search results."""
+    yield "link | snippet | source | rich_snippet | sitelinks"
+    # Nested structures are embedded as JSON strings
+    yield from (
+        f"{r.get('link', '')} | {snippet} | {r.get('source', '')} | "
+        f"{_embed_optional(r.get('rich_snippet'))} | "
+        f"{_embed_optional(r.get('sitelinks'))}"
+        for r, snippet in zip(results, _text_column(results, "snippet"))
+    )
+
+
+# TOON formatter for each scrape source
+_TOON_FORMATTERS: Dict[str, Callable[[Rows], Iterator[str]]] = {
+    "google_play_store": _toon_google_play,
+    "apple_app_store": _toon_apple,
+    "reddit": _toon_reddit,
+    "google_search": _toon_google_search,
+}
+
+
+def iter_reviews_toon(reviews: list, source_type: str) -> Iterator[str]:
     """
-    Convert reviews JSON list to TOON format.
+    Yield reviews as TOON lines: the header first, then one row per item.
     
     Args:
         reviews: List of review dictionaries
         source_type: "google_play_store", "apple_app_store", "reddit", or "google_search"
     
-    Returns:
-        TOON formatted string with header and data rows
+    Yields:
+        TOON header and data rows, without trailing newlines
     """
     if not reviews:
         logger.warning(f"[TOON] Transformation skipped: No data for {source_type}")
-        return ""
+        return
     
     logger.debug(f"[TOON] Converting {len(reviews)} items from {source_type} to TOON format")
     
-    if source_type == "google_play_store":
-        header = "rating | snippet | likes | iso_date"
-        rows = [header]
-        for review in reviews:
-            snippet = sanitize_pipe_text(str(review.get("snippet", "")))
-            row = f"{review.get('rating', '')} | {snippet} | {review.get('likes', '')} | {review.get('iso_date', '')}"
-            rows.append(row)
-        return "\n".join(rows)
-    
-    elif source_type == "apple_app_store":
-        header = "title | text | rating | review_date | reviewed_version"
-        rows = [header]
-        for review in reviews:
-            title = sanitize_pipe_text(str(review.get("title", "")))
-            text = sanitize_pipe_text(str(review.get("text", "")))
-            row = f"{title} | {text} | {review.get('rating', '')} | {review.get('review_date', '')} | {review.get('reviewed_version', '')}"
-            rows.append(row)
-        return "\n".join(rows)
-    
-    elif source_type == "reddit":
-        header = "title | posted | comment_count_stat | body_text | comments_text"
-        rows = [header]
-        for post in reviews:
-            title = sanitize_pipe_text(str(post.get("title", "")))
-            posted = sanitize_pipe_text(str(post.get("posted", "")))
-            comment_count = sanitize_pipe_text(str(post.get("comment_count_stat", "")))
-            body_text = sanitize_pipe_text(str(post.get("body_text", "")))
-            
-            # Extract only text field from comments_content
-            comments_texts = [
-                sanitize_pipe_text(str(c.get("text", "")))
-                for c in post.get("comments_content", [])
-            ]
-            comments_combined = " | ".join(comments_texts) if comments_texts else ""
-            
-            row = f"{title} | {posted} | {comment_count} | {body_text} | {comments_combined}"
-            rows.append(row)
-        return "\n".join(rows)
-    
-    elif source_type == "google_search":
-        header = "link | snippet | source | rich_snippet | sitelinks"
-        rows = [header]
-        for result in reviews:
-            snippet = sanitize_pipe_text(str(result.get("snippet", "")))
-            
-            # Convert nested structures to JSON strings
-            rich_snippet_str = json.dumps(result.get("rich_snippet")) if "rich_snippet" in result else ""
-            sitelinks_str = json.dumps(result.get("sitelinks")) if "sitelinks" in result else ""
-            
-            row = f"{result.get('link', '')} | {snippet} | {result.get('source', '')} | {rich_snippet_str} | {sitelinks_str}"
-            rows.append(row)
-        return "\n".join(rows)
+    formatter = _TOON_FORMATTERS.get(source_type)
+    if formatter is not None:
+        yield from formatter(reviews)
+
+
+def convert_reviews_to_toon(reviews: list, source_type: str) -> str:
+    """
+    Convert reviews JSON list to TOON format.
+    
+    Args:
+        reviews: List of review dictionaries
+        source_type: "google_play_store", "apple_app_store", "reddit", or "google_search"
     
-    return ""
+    Returns:
+        TOON formatted string with header and data rows
+    """
+    return "\n".join(iter_reviews_toon(reviews, source_type))
+
+
+def _write_toon(buf: io.StringIO, reviews: list, source_type: str) -> None:
+    """Stream TOON lines for reviews into a buffer, newline-separated."""
+    first = True
+    for line in iter_reviews_toon(reviews, source_type):
+        if not first:
+            buf.write("\n")
+        buf.write(line)
+        first = False
 
 
 def build_gemini_query(scrape_results: list) -> tuple:
@@ -99,25 +195,29 @@ def build_gemini_query(scrape_results: list) -> tuple:
     
     logger.info(f"[Query Builder] Compiling data from {len(scrape_results)} sources for Gemini.")
 
-    sections = []
+    # Sections are streamed into one buffer instead of being built separately and joined
+    buf = io.StringIO()
     data_summary = {}
     
     for result in scrape_results:
         source = result[0]
+        if source not in ("google_play_store", "apple_app_store", "reddit", "google_search"):
+            continue
+        
+        if buf.tell():
+            buf.write("\n\n")
         
         if source == "google_play_store":
             _, product_id, platform, reviews, total_reviews = result
-            reviews_toon = convert_reviews_to_toon(reviews, "google_play_store")
-            
-            section = f"""=== GOOGLE PLAY STORE REVIEWS ===
+            buf.write(f"""=== GOOGLE PLAY STORE REVIEWS ===
 Source: {source}
 Product ID: {product_id}
 Platform: {platform}
 Total Reviews: {total_reviews}
 
 Reviews (TOON format):
-{reviews_toon}"""
-            sections.append(section)
+""")
+            _write_toon(buf, reviews, "google_play_store")
             
             data_summary[source] = {
                 "total_reviews": total_reviews,
@@ -126,17 +226,15 @@ Reviews (TOON format):
         
         elif source == "apple_app_store":
             _, product_id, country, reviews, total_reviews = result
-            reviews_toon = convert_reviews_to_toon(reviews, "apple_app_store")
-            
-            section = f"""=== APPLE APP STORE REVIEWS ===
+            buf.write(f"""=== APPLE APP STORE REVIEWS ===
 Source: {source}
 Product ID: {product_id}
 Country: {country}
 Total Reviews: {total_reviews}
 
 Reviews (TOON format):
-{reviews_toon}"""
-            sections.append(section)
+""")
+            _write_toon(buf, reviews, "apple_app_store")
             
             data_summary[source] = {
                 "total_reviews": total_reviews,
@@ -145,16 +243,14 @@ Reviews (TOON format):
         
         elif source == "reddit":
             _, keyword, posts, total_posts = result
-            posts_toon = convert_reviews_to_toon(posts, "reddit")
-            
-            section = f"""=== REDDIT POSTS ===
+            buf.write(f"""=== REDDIT POSTS ===
 Source: {source}
 Keyword: {keyword}
 Total Posts: {total_posts}
 
 Posts (TOON format):
-{posts_toon}"""
-            sections.append(section)
+""")
+            _write_toon(buf, posts, "reddit")
             
             data_summary[source] = {
                 "total_posts": total_posts,
@@ -163,29 +259,38 @@ Posts (TOON format):
         
         elif source == "google_search":
             _, query, results, total_results = result
-            results_toon = convert_reviews_to_toon(results, "google_search")
-            
-            section = f"""=== GOOGLE SEARCH RESULTS ===
+            buf.write(f"""=== GOOGLE SEARCH RESULTS ===
 Source: {source}
 Query: {query}
 Total Results: {total_results}
 
 Results (TOON format):
-{results_toon}"""
-            sections.append(section)
+""")
+            _write_toon(buf, results, "google_search")
             
             data_summary[source] = {
                 "total_results": total_results,
                 "analyzed_items": total_results
             }
     
-    combined_query = "\n\n".join(sections)
+    combined_query = buf.getvalue()
     
     logger.info(f"[Query Builder] Query built successfully. Total size: {len(combined_query)} characters.")
 
     return combined_query, data_summary
 
 
+def _rating_column(scrape_results: list) -> List[float]:
+    """Collect the ratings of all store reviews as a single column, skipping unrated ones."""
+    return [
+        float(rating)
+        for result in scrape_results
+        if result[0] in _RATED_SOURCES
+        for rating in [r.get("rating") for r in result[3]]
+        if rating
+    ]
+
+
 def extract_google_search_urls(scrape_results: list, max_urls: int = 15) -> List[str]:
     """
     Extract URLs from Google Search results only (not Reddit).
@@ -198,6 +303,7 @@ def extract_google_search_urls(scrape_results: list, max_urls: int = 15) -> List
         List of URL strings from Google Search results
     """
     urls = []
+    seen = set()
     
     for result in scrape_results:
         source = result[0]
@@ -206,7 +312,8 @@ def extract_google_search_urls(scrape_results: list, max_urls: int = 15) -> List
             results = result[2]
             for res in results:
                 url = res.get("link", "")
-                if url and url not in urls:
+                if url and url not in seen:
+                    seen.add(url)
                     urls.append(url)
                     if len(urls) >= max_urls:
                         break
@@ -232,7 +339,8 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
     
     logger.info("[TOON Parser] Starting extraction of structured data from Gemini response...")
     
-    lines = toon_text.strip().split('\n')
+    # Stray carriage returns are dropped; csv rejects them inside unquoted fields
+    lines = toon_text.strip().replace('\r', '').split('\n')
     
     if not lines:
         logger.error("[TOON Parser] Failed: Gemini returned an empty text string.")
@@ -241,7 +349,7 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
     # Find header line
     header_idx = -1
     for i, line in enumerate(lines):
-        if 'type' in line.lower() and 'category' in line.lower() and 'title' in line.lower():
+        if is_toon_header(line):
             header_idx = i
             break
     
@@ -253,13 +361,32 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
     findings = []
     skipped_rows = 0
     
-    for line_num, line in enumerate(lines[header_idx + 1:], start=header_idx + 2):
-        line = line.strip()
-        if not line:
+    # Rows are split on the pipe delimiter by the C csv reader; quotes are
+    # literal text, and fields are stripped where they are used
+    rows = csv.reader(
+        islice(lines, header_idx + 1, None),
+        delimiter='|',
+        quoting=csv.QUOTE_NONE,
+        skipinitialspace=True
+    )
+    
+    line_num = header_idx + 1
+    while True:
+        line_num += 1
+        # A row the reader rejects (e.g. a field over csv.field_size_limit)
+        # is skipped; the reader resumes at the next line
+        try:
+            parts = next(rows)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            logger.warning(f"[TOON Parser] Skipping malformed row {line_num} ({e})")
+            skipped_rows += 1
             continue
         
-        # Split by pipe delimiter
-        parts = [p.strip() for p in line.split('|')]
+        # Blank lines come back as no fields, or a single whitespace field
+        if not parts or (len(parts) == 1 and not parts[0].strip()):
+            continue
         
         if len(parts) < 3:
             logger.warning(f"[TOON Parser] Skipping malformed row {line_num} (Insufficient columns)")
@@ -269,7 +396,7 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
         try:
             # Extract fields with defaults
             finding_type = parts[0] if len(parts) > 0 else "pain_point"
-            category = parts[1] if len(parts) > 1 else "other"
+            category = parts[1].strip() if len(parts) > 1 else "other"
             title = parts[2] if len(parts) > 2 else "Untitled"
             description = parts[3] if len(parts) > 3 else ""
             
@@ -289,21 +416,18 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
             # Parse sample_reviews
             sample_reviews_str = parts[6] if len(parts) > 6 else ""
             try:
-                sample_reviews = json.loads(sample_reviews_str)
-                sample_reviews = [
-                    s.replace("[PIPE]", "|").replace("\"", "").replace('\\', '').strip()
-                    for s in sample_reviews
-                ]
+                sample_reviews = json_loads(sample_reviews_str)
+                sample_reviews = [_clean_finding_text(s) for s in sample_reviews]
             except json.JSONDecodeError:
                 sample_reviews = [
-                    s.replace("[PIPE]", "|").replace("\"", "").replace("\\", "").strip()
+                    _clean_finding_text(s)
                     for s in sample_reviews_str.split(',') 
                     if s.strip()
                 ]
 
             # Parse recommendation
             recommendation = parts[7] if len(parts) > 7 else ""
-            recommendation = recommendation.replace('[PIPE]', '|').replace('"', '').replace('\\', '').strip()
+            recommendation = _clean_finding_text(recommendation)
 
             # Parse priority_score
             priority_str = parts[8] if len(parts) > 8 else "5"
@@ -317,8 +441,8 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
             sources = [s.strip() for s in sources_str.split(',') if s.strip()]
             
             # Clean text fields
-            title = title.replace('[PIPE]', '|').replace('"', '').replace('\\', '').strip()
-            description = description.replace('[PIPE]', '|').replace('"', '').replace('\\', '').strip()
+            title = _clean_finding_text(title)
+            description = _clean_finding_text(description)
 
             finding = {
                 "type": finding_type.strip(),
@@ -346,19 +470,25 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
         logger.error("[TOON Parser] Final result is empty. No valid findings were extracted.")
         return None
     
-    # Group findings by type
-    bugs = [f for f in findings if f["type"] == "bug"]
-    feature_requests = [f for f in findings if f["type"] == "feature_request"]
-    requirements = [f for f in findings if f["type"] == "requirement"]
-    usability_frictions = [f for f in findings if f["type"] == "usability_friction"]
-    pain_points = [f for f in findings if f["type"] == "pain_point"]
-    positive_reviews = [f for f in findings if f["type"] == "positive_review"]
-    ai_insights = [f for f in findings if f["type"] == "ai_insight"]
+    # Group findings by type and total their frequencies in one pass
+    groups = defaultdict(list)
+    frequency_totals = defaultdict(int)
+    for f in findings:
+        groups[f["type"]].append(f)
+        frequency_totals[f["type"]] += f["frequency"]
+    
+    bugs = groups["bug"]
+    feature_requests = groups["feature_request"]
+    requirements = groups["requirement"]
+    usability_frictions = groups["usability_friction"]
+    pain_points = groups["pain_point"]
+    positive_reviews = groups["positive_review"]
+    ai_insights = groups["ai_insight"]
     
     # Calculate overall sentiment
-    total_positive = sum(f["frequency"] for f in positive_reviews)
-    total_negative = sum(f["frequency"] for f in bugs) + sum(f["frequency"] for f in pain_points)
-    total_neutral = sum(f["frequency"] for f in feature_requests) + sum(f["frequency"] for f in requirements)
+    total_positive = frequency_totals["positive_review"]
+    total_negative = frequency_totals["bug"] + frequency_totals["pain_point"]
+    total_neutral = frequency_totals["feature_request"] + frequency_totals["requirement"]
     total_sentiment = total_positive + total_negative + total_neutral
     
     if total_sentiment > 0:
@@ -369,17 +499,8 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
         positive_pct = negative_pct = neutral_pct = 33.3
     
     # Calculate average rating
-    ratings = []
-    for result in scrape_results:
-        source = result[0]
-        if source in ["google_play_store", "apple_app_store"]:
-            reviews = result[3]
-            for r in reviews:
-                rating = r.get("rating")
-                if rating:
-                    ratings.append(float(rating))
-    
-    avg_rating = sum(ratings) / len(ratings) if ratings else 0
+    ratings = _rating_column(scrape_results)
+    avg_rating = statistics.fmean(ratings) if ratings else 0
     
     # Calculate total reviews analyzed
     total_reviews = 0
@@ -392,33 +513,17 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
     # Build priority actions
     priority_actions = []
     
-    critical_bugs = sorted([f for f in bugs if f["severity"] == "critical"], 
-                          key=lambda x: x["priority_score"], reverse=True)[:3]
-    for bug in critical_bugs:
-        priority_actions.append({
-            "action": f"Fix critical bug: {bug['title']}",
-            "reason": f"Critical severity with {bug['frequency']} mentions",
-            "expected_impact": "high",
-            "effort_required": "high"
-        })
-    
-    top_requirements = sorted(requirements, key=lambda x: x["priority_score"], reverse=True)[:2]
-    for req in top_requirements:
-        priority_actions.append({
-            "action": f"Implement required feature: {req['title']}",
-            "reason": f"Expected by users ({req['frequency']} mentions)",
-            "expected_impact": "high",
-            "effort_required": "medium"
-        })
-    
-    top_frictions = sorted(usability_frictions, key=lambda x: x["priority_score"], reverse=True)[:2]
-    for friction in top_frictions:
-        priority_actions.append({
-            "action": f"Fix UX issue: {friction['title']}",
-            "reason": f"Causes user frustration ({friction['frequency']} mentions)",
-            "expected_impact": "medium",
-            "effort_required": "low"
-        })
+    for finding_type, keep, limit, action, reason, impact, effort in _PRIORITY_ACTION_RULES:
+        pool = groups[finding_type]
+        if keep is not None:
+            pool = filter(keep, pool)
+        for finding in heapq.nlargest(limit, pool, key=lambda x: x["priority_score"]):
+            priority_actions.append({
+                "action": action.format(**finding),
+                "reason": reason.format(**finding),
+                "expected_impact": impact,
+                "effort_required": effort
+            })
     
     priority_actions = priority_actions[:7]
     
@@ -426,14 +531,15 @@ def parse_toon_findings(toon_text: str, scrape_results: list, data_summary: dict
     key_insights = []
     
     if bugs:
-        key_insights.append(f"Found {len(bugs)} bugs, {len(critical_bugs)} critical. Top issue: {bugs[0]['title']}")
+        critical_count = sum(1 for f in bugs if f["severity"] == "critical")
+        key_insights.append(f"Found {len(bugs)} bugs, {critical_count} critical. Top issue: {bugs[0]['title']}")
     
     if feature_requests:
-        top_feature = sorted(feature_requests, key=lambda x: x["frequency"], reverse=True)[0]
+        top_feature = max(feature_requests, key=lambda x: x["frequency"])
         key_insights.append(f"Top feature request: {top_feature['title']} ({top_feature['frequency']} mentions)")
     
     if positive_reviews:
-        top_positive = sorted(positive_reviews, key=lambda x: x["frequency"], reverse=True)[0]
+        top_positive = max(positive_reviews, key=lambda x: x["frequency"])
         key_insights.append(f"Users love: {top_positive['title']} ({top_positive['frequency']} mentions)")
     
     key_insights.append(f"Overall sentiment: {round(positive_pct, 1)}% positive, {round(negative_pct, 1)}% negative")
@@ -1,21 +1,33 @@
 """Google Play Store scraper service."""
-from serpapi import GoogleSearch
+from typing import Optional
+
+import httpx
 
 from app.config import get_settings
+from app.core.http_client import SERPAPI_HOST, SERPAPI_SEARCH_URL, SERPAPI_TIMEOUT, get_http_client, host_slot
+from app.core.scrape_cache import cached_scrape
 from app.logging_config import get_logger
+from app.utils.helpers import json_loads
 
 
 logger = get_logger(__name__)
 settings = get_settings()
+_SERPAPI_KEY = settings.SERPAPI_KEY
 
 
-async def scrape_google_play_reviews(product_id: str, platform: str = "phone") -> tuple:
+@cached_scrape("google_play")
+async def scrape_google_play_reviews(
+    product_id: str,
+    platform: str = "phone",
+    client: Optional[httpx.AsyncClient] = None
+) -> tuple:
     """
     Scrape Google Play Store reviews.
     
     Args:
         product_id: Google Play Store product ID (e.g., com.google.android.youtube)
         platform: Platform type (phone/tablet/tv/wearables/auto/chromebook)
+        client: Shared HTTP client (defaults to the process-wide client)
     
     Returns:
         tuple: (source, product_id, platform, reviews_json, total_reviews)
@@ -31,13 +43,16 @@ async def scrape_google_play_reviews(product_id: str, platform: str = "phone") -
         "sort_by": "2",
         "num": "199",
         "json_restrictor": "reviews[].{rating, snippet, likes, iso_date}",
-        "api_key": settings.SERPAPI_KEY
+        "api_key": _SERPAPI_KEY
     }
     
     try:
         logger.debug(f"Sending request to SerpApi for Google Play product: {product_id}")
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        client = client or get_http_client()
+        async with host_slot(SERPAPI_HOST):
+            response = await client.get(SERPAPI_SEARCH_URL, params=params, timeout=SERPAPI_TIMEOUT)
+        response.raise_for_status()
+        results = json_loads(response.content)
         reviews = results.get("reviews", [])
         
         logger.info(f"[Google Play Store] Successfully fetched {len(reviews)} reviews")
@@ -1,20 +1,48 @@
 """Google Search scraper service."""
-from serpapi import GoogleSearch
+from typing import Any, Dict, Optional
+
+import httpx
 
 from app.config import get_settings
+from app.core.http_client import SERPAPI_HOST, SERPAPI_SEARCH_URL, SERPAPI_TIMEOUT, get_http_client, host_slot
+from app.core.scrape_cache import cached_scrape
 from app.logging_config import get_logger
+from app.utils.helpers import json_loads
 
 
 logger = get_logger(__name__)
 settings = get_settings()
+_SERPAPI_KEY = settings.SERPAPI_KEY
+
+
+def _extract_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the fields used downstream from one organic search result."""
+    result_data = {
+        "link": result.get("link", ""),
+        "snippet": result.get("snippet", ""),
+        "source": result.get("source", "")
+    }
+    
+    # Add rich_snippet and sitelinks if available
+    rich_snippet = result.get("rich_snippet")
+    if rich_snippet is not None:
+        result_data["rich_snippet"] = rich_snippet
+    
+    sitelinks = result.get("sitelinks")
+    if sitelinks is not None:
+        result_data["sitelinks"] = sitelinks
+    
+    return result_data
 
 
-async def scrape_google_search(product_name: str) -> tuple:
+@cached_scrape("google_search")
+async def scrape_google_search(product_name: str, client: Optional[httpx.AsyncClient] = None) -> tuple:
     """
     Scrape Google search results for product reviews using SerpAPI.
     
     Args:
         product_name: Name of the product to search for reviews
+        client: Shared HTTP client (defaults to the process-wide client)
     
     Returns:
         tuple: (source, query, results_json, total_results)
@@ -25,35 +53,21 @@ async def scrape_google_search(product_name: str) -> tuple:
     params = {
         "engine": "google",
         "q": query,
-        "api_key": settings.SERPAPI_KEY
+        "api_key": _SERPAPI_KEY
     }
     
     try:
         logger.debug(f"Requesting Google Search results for query: {query}")
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        client = client or get_http_client()
+        async with host_slot(SERPAPI_HOST):
+            response = await client.get(SERPAPI_SEARCH_URL, params=params, timeout=SERPAPI_TIMEOUT)
+        response.raise_for_status()
+        results = json_loads(response.content)
         
         organic_results = results.get("organic_results", [])
         
         # Extract relevant fields from each result
-        processed_results = []
-        
-        for result in organic_results:
-            result_data = {
-                "link": result.get("link", ""),
-                "snippet": result.get("snippet", ""),
-                "source": result.get("source", "")
-            }
-            
-            # Add rich_snippet if available
-            if "rich_snippet" in result:
-                result_data["rich_snippet"] = result.get("rich_snippet")
-            
-            # Add sitelinks if available
-            if "sitelinks" in result:
-                result_data["sitelinks"] = result.get("sitelinks")
-            
-            processed_results.append(result_data)
+        processed_results = [_extract_result(result) for result in organic_results]
         
         logger.info(f"[Google Search] Successfully fetched {len(processed_results)} results")
 
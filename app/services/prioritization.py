@@ -1,6 +1,5 @@
 """Prioritization service using Gemini."""
 import json
-import asyncio
 from typing import Dict, Any
 
 from app.config import get_settings
@@ -12,32 +11,9 @@ from app.services.sentiment import create_gemini_client_with_tools
 logger = get_logger(__name__)
 settings = get_settings()
 
-
-async def perform_prioritization(
-    toon_content: str, 
-    method: str, 
-    duration: int, 
-    budget: int, 
-    business_goal: str
-) -> Dict[str, Any]:
-    """
-    Uses Gemini to prioritize tasks and returns a JSON dictionary.
-    
-    Args:
-        toon_content: TOON formatted content from sentiment analysis
-        method: Prioritization method (MoSCoW or Lean Prioritization)
-        duration: Sprint duration in days
-        budget: Developer hours budget
-        business_goal: Current business goal
-    
-    Returns:
-        Dictionary containing the prioritization plan
-    """
-    logger.info(f"Starting {method} prioritization. Goal: '{business_goal}', Budget: {budget}hrs")
-    
-    client, model_name, generate_config = create_gemini_client_with_tools()
-
-    prompt = f"""You are an expert Product Manager.
+# Prioritization prompt, built once; only the slots below are filled per call:
+# {method}, {duration}, {budget}, {business_goal}, {toon_content}
+_PROMPT_TEMPLATE = """You are an expert Product Manager.
     
     CONTEXT:
     We have analyzed user feedback and generated a list of issues in TOON format.
@@ -96,18 +72,51 @@ async def perform_prioritization(
     {toon_content}
     """
 
+
+async def perform_prioritization(
+    toon_content: str, 
+    method: str, 
+    duration: int, 
+    budget: int, 
+    business_goal: str
+) -> Dict[str, Any]:
+    """
+    Uses Gemini to prioritize tasks and returns a JSON dictionary.
+    
+    Args:
+        toon_content: TOON formatted content from sentiment analysis
+        method: Prioritization method (MoSCoW or Lean Prioritization)
+        duration: Sprint duration in days
+        budget: Developer hours budget
+        business_goal: Current business goal
+    
+    Returns:
+        Dictionary containing the prioritization plan
+    """
+    logger.info(f"Starting {method} prioritization. Goal: '{business_goal}', Budget: {budget}hrs")
+    
+    client, model_name, generate_config = create_gemini_client_with_tools()
+
+    prompt = _PROMPT_TEMPLATE.format(
+        method=method,
+        duration=duration,
+        budget=budget,
+        business_goal=business_goal,
+        toon_content=toon_content
+    )
+
     try:
-        loop = asyncio.get_event_loop()
-        
-        def generate_content():
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=generate_config
-            )
-            return response.text if response else None
-        
-        response_text = await loop.run_in_executor(None, generate_content)
+        # Stream the plan on the native async client; no executor thread is
+        # held while Gemini generates, and chunks are joined once at the end
+        chunks = []
+        async for chunk in await client.aio.models.generate_content_stream(
+            model=model_name,
+            contents=prompt,
+            config=generate_config
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+        response_text = "".join(chunks)
         
         if not response_text:
             logger.error("Gemini returned empty response for prioritization")
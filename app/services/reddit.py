@@ -1,12 +1,14 @@
 """Async Reddit scraper service using httpx."""
 import asyncio
 import random
-from typing import Dict, List, Any
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 
 from app.config import get_settings
+from app.core.http_client import REDDIT_HOST, REDDIT_TIMEOUT, get_http_client, get_with_backoff
 from app.logging_config import get_logger
 from app.utils.constants import USER_AGENTS
 
@@ -15,136 +17,288 @@ logger = get_logger(__name__)
 settings = get_settings()
 
 
+# Request headers shared by every Reddit request; only the User-Agent varies
+_BASE_HEADERS: Dict[str, str] = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Referer': 'https://www.google.com/',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# CSS selectors for old.reddit.com thread and search pages
+_THREAD_TITLE_SEL = "a.title"
+_THREAD_TIME_SEL = "time"
+_THREAD_POST_SEL = "div.link"
+_USERTEXT_SEL = "div.usertext-body"
+_COMMENT_AREA_SEL = "div.commentarea"
+_COMMENT_SEL = "div.entry"
+_SEARCH_TITLE_LINK_SEL = "div.search-result a.search-title"
+_NEXTPREV_LINK_SEL = "span.nextprev a"
+
+# Thread id in a Reddit permalink, e.g. /r/apps/comments/abc123/title/
+_THREAD_ID_RE = re.compile(r"/comments/([a-z0-9]+)", re.IGNORECASE)
+
+# Maximum comments extracted per thread
+MAX_THREAD_COMMENTS = 20
+
+
 def _get_random_headers() -> Dict[str, str]:
-    """Get random headers for request."""
+    """Get request headers with a random User-Agent."""
+    headers = dict(_BASE_HEADERS)
+    headers['User-Agent'] = random.choice(USER_AGENTS)
+    return headers
+
+
+def _parse_thread_page(content: bytes) -> Dict[str, Any]:
+    """
+    Parse a thread page into its title, posted time, body text and comments.
+    
+    Runs in a worker thread so parsing does not block the event loop.
+    
+    Args:
+        content: Raw HTML of the thread page
+    
+    Returns:
+        dict with keys: title, posted, comment_count_stat, body_text, comments_content
+    """
+    tree = LexborHTMLParser(content)
+
+    # Extract title
+    title = ""
+    title_tag = tree.css_first(_THREAD_TITLE_SEL)
+    if title_tag:
+        title = title_tag.text(strip=True)
+
+    # Extract posted time
+    posted = ""
+    time_tag = tree.css_first(_THREAD_TIME_SEL)
+    if time_tag:
+        posted = time_tag.attributes.get("title") or time_tag.text(strip=True)
+
+    # Extract comment count
+    comment_count = "0"
+    
+    # 1. Extract Post Body
+    body_text = ""
+    main_post = tree.css_first(_THREAD_POST_SEL)
+    if main_post:
+        usertext = main_post.css_first(_USERTEXT_SEL)
+        if usertext:
+            body_text = usertext.text(separator="\n", strip=True, skip_empty=True)
+
+    # 2. Extract Comments
+    comments_data = []
+    comment_area = tree.css_first(_COMMENT_AREA_SEL)
+    if comment_area:
+        all_comments = comment_area.css(_COMMENT_SEL)[:MAX_THREAD_COMMENTS]
+        
+        for comment in all_comments:
+            try:
+                text_div = comment.css_first(_USERTEXT_SEL)
+                text = text_div.text(strip=True) if text_div else ""
+                
+                if text:
+                    comments_data.append({
+                        "text": text
+                    })
+            except Exception:
+                continue
+        
+        comment_count = str(len(comments_data))
+        logger.debug(f"[Reddit] Extracted {comment_count} comments from {title[:30]}...")
+
     return {
-        'User-Agent': random.choice(USER_AGENTS),
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Referer': 'https://www.google.com/',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
+        "title": title,
+        "posted": posted,
+        "comment_count_stat": comment_count,
+        "body_text": body_text,
+        "comments_content": comments_data
     }
 
 
+def _parse_search_page(content: bytes) -> Tuple[List[Optional[str]], Optional[str]]:
+    """
+    Parse a search results page into its result links and the next-page link.
+    
+    Runs in a worker thread so parsing does not block the event loop. Each
+    lookup is a single descendant query returning only the links needed.
+    
+    Args:
+        content: Raw HTML of the search page
+    
+    Returns:
+        Tuple of (href of each result title link, next page href or None)
+    """
+    tree = LexborHTMLParser(content)
+    
+    hrefs = [link.attributes.get("href") for link in tree.css(_SEARCH_TITLE_LINK_SEL)]
+    
+    # Pagination logic
+    next_link = None
+    for link in tree.css(_NEXTPREV_LINK_SEL):
+        if "next" in link.text(strip=True).lower():
+            next_link = link.attributes.get("href")
+            break
+    
+    return hrefs, next_link
+
+
 async def _scrape_thread_details(
     client: httpx.AsyncClient, 
-    thread_url: str,
-    semaphore: asyncio.Semaphore
+    thread_url: str
 ) -> Dict[str, Any]:
     """
     Visits a specific thread URL to extract the body text and comments.
-    Uses semaphore for rate limiting.
+    The request holds a Reddit host slot, which caps concurrency and paces
+    requests, and is retried with backoff if Reddit rate-limits it.
     
     Args:
         client: httpx.AsyncClient instance
         thread_url: URL of the Reddit thread
-        semaphore: asyncio.Semaphore for rate limiting
     
     Returns:
         dict with keys: title, posted, comment_count_stat, body_text, comments_content, url
     """
-    async with semaphore:
-        logger.info(f"[Reddit] Visiting thread: {thread_url[:60]}...")
+    logger.info(f"[Reddit] Visiting thread: {thread_url[:60]}...")
+    
+    try:
+        response = await get_with_backoff(
+            client,
+            REDDIT_HOST,
+            thread_url,
+            headers=_get_random_headers(),
+            timeout=REDDIT_TIMEOUT
+        )
         
-        try:
-            # Random sleep to avoid rate limiting
-            await asyncio.sleep(random.uniform(2, 4))
-            
-            response = await client.get(
-                thread_url,
-                headers=_get_random_headers(),
-                timeout=10.0
-            )
-            
-            if response.status_code != 200:
-                logger.warning(f"[Reddit] Failed to load thread: {thread_url}. Status: {response.status_code}")
-                return {
-                    "title": "[Error: Could not load]",
-                    "posted": "Unknown",
-                    "comment_count_stat": "0",
-                    "body_text": "[Error: Could not load]",
-                    "comments_content": [],
-                    "url": thread_url
-                }
+        if response.status_code != 200:
+            logger.warning(f"[Reddit] Failed to load thread: {thread_url}. Status: {response.status_code}")
+            return {
+                "title": "[Error: Could not load]",
+                "posted": "Unknown",
+                "comment_count_stat": "0",
+                "body_text": "[Error: Could not load]",
+                "comments_content": [],
+                "url": thread_url
+            }
 
-            soup = BeautifulSoup(response.content, "html.parser")
+        # Parsing is CPU-bound; run it off the event loop so other requests progress
+        thread = await asyncio.to_thread(_parse_thread_page, response.content)
+        thread["url"] = thread_url
+        return thread
 
-            # Extract title
-            title = ""
-            title_tag = soup.find("a", class_="title")
-            if title_tag:
-                title = title_tag.get_text(strip=True)
+    except Exception as e:
+        logger.error(f"[Reddit] Error reading thread {thread_url}: {e}", exc_info=True)
+        return {
+            "title": "[Error]",
+            "posted": "Unknown",
+            "comment_count_stat": "0",
+            "body_text": "[Error]",
+            "comments_content": [],
+            "url": thread_url
+        }
 
-            # Extract posted time
-            posted = ""
-            time_tag = soup.find("time")
-            if time_tag:
-                posted = time_tag.get("title", time_tag.get_text(strip=True))
 
-            # Extract comment count
-            comment_count = "0"
-            
-            # 1. Extract Post Body
-            body_text = ""
-            main_post = soup.find("div", class_="link")
-            if main_post:
-                usertext = main_post.find("div", class_="usertext-body")
-                if usertext:
-                    body_text = usertext.get_text(separator="\n", strip=True)
+async def _iter_thread_urls(
+    client: httpx.AsyncClient,
+    search_keyword: str,
+    limit_pages: int
+) -> AsyncIterator[str]:
+    """
+    Page through old.reddit.com search results, yielding thread URLs as each page is parsed.
+    
+    Args:
+        client: httpx.AsyncClient instance
+        search_keyword: Full search query
+        limit_pages: Maximum pages to scrape
+    
+    Yields:
+        Absolute thread URLs, excluding user profiles and threads already yielded
+    """
+    base_url = "https://old.reddit.com/search"
+    
+    # Thread ids (or URLs, when no id is found) already yielded across pages
+    seen = set()
+    
+    # Use relevance sort and filter by month
+    current_url = f"{base_url}?q={search_keyword}&sort=relevance&t=month"
+    
+    page_counter = 0
+    
+    while current_url and page_counter < limit_pages:
+        page_counter += 1
+        logger.info(f"[Reddit] Scraping Search Page {page_counter}...")
 
-            # 2. Extract Comments
-            comments_data = []
-            comment_area = soup.find("div", class_="commentarea")
-            if comment_area:
-                # Limit to top 20 comments
-                all_comments = comment_area.find_all("div", class_="entry", limit=20) 
-                
-                for comment in all_comments:
-                    try:
-                        text_div = comment.find("div", class_="usertext-body")
-                        text = text_div.get_text(strip=True) if text_div else ""
-                        
-                        if text:
-                            comments_data.append({
-                                "text": text
-                            })
-                    except Exception:
+        try:
+            # Rate-limited pages are retried with backoff; a persistent 429 raises here
+            response = await get_with_backoff(
+                client,
+                REDDIT_HOST,
+                current_url,
+                headers=_get_random_headers(),
+                timeout=REDDIT_TIMEOUT
+            )
+            response.raise_for_status()
+            
+            # Parsing is CPU-bound; run it off the event loop so other requests progress
+            hrefs, next_link = await asyncio.to_thread(_parse_search_page, response.content)
+            
+            if not hrefs:
+                logger.info(f"[Reddit] No results found on page {page_counter}.")
+                break
+            
+            page_urls = []
+            for href in hrefs:
+                if href:
+                    if href.startswith("/"):
+                        href = f"https://old.reddit.com{href}"
+                    
+                    # Skip user profiles and threads already found on an earlier result
+                    if "/user/" in href:
                         continue
-                
-                comment_count = str(len(comments_data))
-                logger.debug(f"[Reddit] Extracted {comment_count} comments from {title[:30]}...")
-
-            return {
-                "title": title,
-                "posted": posted,
-                "comment_count_stat": comment_count,
-                "body_text": body_text,
-                "comments_content": comments_data,
-                "url": thread_url
-            }
-
+                    
+                    thread_id = _THREAD_ID_RE.search(href)
+                    key = thread_id.group(1).lower() if thread_id else href
+                    if key not in seen:
+                        seen.add(key)
+                        page_urls.append(href)
+        
         except Exception as e:
-            logger.error(f"[Reddit] Error reading thread {thread_url}: {e}", exc_info=True)
-            return {
-                "title": "[Error]",
-                "posted": "Unknown",
-                "comment_count_stat": "0",
-                "body_text": "[Error]",
-                "comments_content": [],
-                "url": thread_url
-            }
+            logger.error(f"[Reddit] Error on search page {page_counter}: {e}", exc_info=True)
+            break
+        
+        for url in page_urls:
+            yield url
+        
+        if next_link:
+            # Handle relative URLs
+            if next_link.startswith("/"):
+                next_link = f"https://old.reddit.com{next_link}"
+            
+            current_url = next_link
+            await asyncio.sleep(2)  # Rate limiting delay
+        else:
+            logger.info(f"[Reddit] Reached end of search results at Page {page_counter}.")
+            current_url = None
 
 
-async def scrape_reddit(keyword: str, limit_pages: int = 2) -> tuple:
+async def scrape_reddit(
+    keyword: str, 
+    limit_pages: int = 2,
+    client: Optional[httpx.AsyncClient] = None
+) -> tuple:
     """
     Scrape Reddit using keyword search on old.reddit.com with full content extraction.
     Uses httpx.AsyncClient for async HTTP requests.
     
+    Thread scrapes start as soon as their search page is parsed, so detail
+    extraction overlaps the remaining search pages.
+    
     Args:
         keyword: Single keyword to search for (will have " Review" appended)
         limit_pages: Maximum pages to scrape (default: 2)
+        client: httpx.AsyncClient to use (default: shared process-wide client)
     
     Returns:
         tuple: (source, keyword, scraped_posts_list, total_posts)
@@ -153,115 +307,36 @@ async def scrape_reddit(keyword: str, limit_pages: int = 2) -> tuple:
     search_keyword = f"{keyword.strip()} Review"
     logger.info(f"[Reddit] Starting keyword search for: {search_keyword}")
     
-    base_url = "https://old.reddit.com/search"
-    all_urls: List[str] = []
+    client = client or get_http_client()
     
-    # Create async client with connection pooling
-    async with httpx.AsyncClient(
-        follow_redirects=True,
-        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
-    ) as client:
-        
-        logger.info(f"[Reddit] --- Starting search for: {search_keyword} ---")
-
-        # Use relevance sort and filter by month
-        current_url = f"{base_url}?q={search_keyword}&sort=relevance&t=month"
-        
-        page_counter = 0
-        
-        # Step 1: Collect URLs
-        while current_url and page_counter < limit_pages:
-            page_counter += 1
-            logger.info(f"[Reddit] Scraping Search Page {page_counter}...")
+    logger.info(f"[Reddit] --- Starting search for: {search_keyword} ---")
 
-            try:
-                response = await client.get(
-                    current_url, 
-                    headers=_get_random_headers(), 
-                    timeout=10.0
-                )
-                
-                # Handle rate limiting
-                if response.status_code == 429:
-                    logger.warning(f"[Reddit] Rate limit hit (429). Sleeping for 30 seconds...")
-                    await asyncio.sleep(30)
-                    continue
-                
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, "html.parser")
-                
-                results = soup.find_all("div", class_="search-result")
-                
-                if not results:
-                    logger.info(f"[Reddit] No results found on page {page_counter}.")
-                    break
-                
-                for result in results:
-                    title_tag = result.find("a", class_="search-title")
-                    
-                    if title_tag:
-                        href = title_tag["href"]
-                        
-                        if href.startswith("/"):
-                            href = f"https://old.reddit.com{href}"
-                        
-                        # Skip user profiles
-                        if "/user/" not in href:
-                            all_urls.append(href)
-                
-                # Pagination logic
-                next_button = soup.find("span", class_="nextprev")
-                next_link = None
-                
-                if next_button:
-                    for link in next_button.find_all("a"):
-                        if "next" in link.get_text(strip=True).lower():
-                            next_link = link["href"]
-                            break
-                
-                if next_link:
-                    # Handle relative URLs
-                    if next_link.startswith("/"):
-                        next_link = f"https://old.reddit.com{next_link}"
-                    
-                    current_url = next_link
-                    await asyncio.sleep(2)  # Rate limiting delay
-                else:
-                    logger.info(f"[Reddit] Reached end of search results at Page {page_counter}.")
-                    current_url = None
-            
-            except Exception as e:
-                logger.error(f"[Reddit] Error on search page {page_counter}: {e}", exc_info=True)
-                break
-        
-        logger.info(f"[Reddit] Found {len(all_urls)} thread URLs. Beginning detail extraction...")
-
-        # Step 2: Scrape full content from each URL concurrently with rate limiting
-        # Use semaphore to limit concurrent requests
-        semaphore = asyncio.Semaphore(settings.REDDIT_CONCURRENT_LIMIT)
-        
-        # Create tasks for concurrent scraping
-        tasks = [
-            _scrape_thread_details(client, url, semaphore) 
-            for url in all_urls
-        ]
-        
-        # Execute all tasks concurrently
-        scraped_posts = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Filter out exceptions
-        valid_posts = [
-            post for post in scraped_posts 
-            if isinstance(post, dict)
-        ]
-        
-        total_posts = len(valid_posts)
-        logger.info(f"[Reddit] Successfully finished. Scraped {total_posts} threads for keyword: {search_keyword}")
+    # Concurrency and request rate are capped per host across all scrapes
+    tasks: List[asyncio.Task] = []
+    try:
+        async for url in _iter_thread_urls(client, search_keyword, limit_pages):
+            tasks.append(asyncio.create_task(_scrape_thread_details(client, url)))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    logger.info(f"[Reddit] Found {len(tasks)} thread URLs. Waiting for detail extraction...")
+    
+    scraped_posts = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Filter out exceptions
+    valid_posts = [
+        post for post in scraped_posts 
+        if isinstance(post, dict)
+    ]
+    
+    total_posts = len(valid_posts)
+    logger.info(f"[Reddit] Successfully finished. Scraped {total_posts} threads for keyword: {search_keyword}")
 
-        return (
-            "reddit",
-            search_keyword,
-            valid_posts,
-            total_posts
-        )
+    return (
+        "reddit",
+        search_keyword,
+        valid_posts,
+        total_posts
+    )
@@ -1,25 +1,74 @@
 """Gemini sentiment analysis service."""
 import asyncio
-from typing import Dict, Any
+import bisect
+import functools
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
 from google import genai as genai_new
+from google.genai import errors as genai_errors
 from google.genai import types
 
 from app.config import get_settings
 from app.logging_config import get_logger
 from app.services.data_processor import (
     extract_google_search_urls,
+    is_toon_header,
     parse_toon_findings
 )
+from app.utils.helpers import RETRYABLE_STATUS_CODES, backoff_delay
 
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Attempts per Gemini request when the API keeps answering 429/503
+GEMINI_MAX_ATTEMPTS = 5
 
+_batch_semaphore: Optional[asyncio.Semaphore] = None
+
+
+async def _stream_with_backoff(
+    client: genai_new.Client,
+    model_name: str,
+    contents: List[types.Content],
+    generate_config: types.GenerateContentConfig
+) -> str:
+    """
+    Stream a Gemini response on the async client and return its full text.
+    
+    Chunks are collected in a list and joined once. Rate-limited calls are
+    retried from the start with backoff.
+    """
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        try:
+            chunks: List[str] = []
+            async for chunk in await client.aio.models.generate_content_stream(
+                model=model_name,
+                contents=contents,
+                config=generate_config,
+            ):
+                if chunk.text:
+                    chunks.append(chunk.text)
+            return "".join(chunks)
+        except genai_errors.APIError as e:
+            if e.code not in RETRYABLE_STATUS_CODES or attempt == GEMINI_MAX_ATTEMPTS - 1:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(
+                f"[Gemini] Rate limited ({e.code}); retrying in {delay:.1f}s "
+                f"({attempt + 1}/{GEMINI_MAX_ATTEMPTS})"
+            )
+            await asyncio.sleep(delay)
+
+
+@functools.lru_cache(maxsize=1)
 def create_gemini_client_with_tools():
     """
-    Create a new Gemini client with URL Context and Google Search capability.
+    Get the process-wide Gemini client with URL Context and Google Search capability.
+    
+    The client and its tool config are built on first use and shared by
+    every analysis afterwards; a failed setup is retried on the next call.
     
     Returns:
         Tuple of (client, model_name, config)
@@ -83,14 +132,16 @@ async def analyze_sentiment_with_gemini(
 
         MAX_TOKENS_PER_REQUEST = 200000
         
+        google_urls = extract_google_search_urls(scrape_results, max_urls=15)
+        
         if estimated_tokens > MAX_TOKENS_PER_REQUEST:
             logger.info(f"[Gemini] Large dataset detected. Using batch processing...")
             return await _analyze_sentiment_batch_processing(
-                model_name, scrape_results, combined_text, data_summary, product_name
+                client, model_name, generate_config,
+                scrape_results, combined_text, data_summary, product_name,
+                google_urls=google_urls
             )
         
-        google_urls = extract_google_search_urls(scrape_results, max_urls=15)
-        
         urls_section = ""
         if google_urls:
             urls_list = "\n".join([f"- {url}" for url in google_urls])
@@ -122,20 +173,7 @@ Include findings from social media in your analysis.
         
         logger.info(f"[Gemini] Sending request to {model_name}...")
         
-        loop = asyncio.get_event_loop()
-        
-        def generate_content():
-            response_text = ""
-            for chunk in client.models.generate_content_stream(
-                model=model_name,
-                contents=contents,
-                config=generate_config,
-            ):
-                if hasattr(chunk, 'text') and chunk.text:
-                    response_text += chunk.text
-            return response_text
-        
-        response_text = await loop.run_in_executor(None, generate_content)
+        response_text = await _stream_with_backoff(client, model_name, contents, generate_config)
         analysis_text = response_text.strip()
         
         # Parse TOON format response
@@ -169,39 +207,69 @@ Include findings from social media in your analysis.
         }
 
 
+# Characters of TOON text sent to Gemini per batch
+MAX_CHARS_PER_BATCH = 600000
+
+# Blank line between TOON sections; a lookahead so overlapping runs all match
+_SECTION_SEPARATOR_RE = re.compile(r"(?=\n\n)")
+
+
+def _split_batches(text: str, max_chars: int = MAX_CHARS_PER_BATCH) -> List[Tuple[int, int, str]]:
+    """Split text into (start, end, batch_text) chunks, preferring to break at blank lines."""
+    total_size = len(text)
+    
+    # Start of every blank-line separator (overlapping runs included), found
+    # in one pass; each cut point is then a bisect instead of an rfind
+    separators = [m.start() for m in _SECTION_SEPARATOR_RE.finditer(text)]
+    
+    batches = []
+    start_idx = 0
+    
+    while start_idx < total_size:
+        end_idx = min(start_idx + max_chars, total_size)
+        
+        if end_idx < total_size:
+            # Last separator lying wholly inside this batch
+            idx = bisect.bisect_right(separators, end_idx - 2) - 1
+            if idx >= 0 and separators[idx] - start_idx > max_chars * 0.8:
+                batches.append((start_idx, separators[idx] + 2, text[start_idx:separators[idx]]))
+                start_idx = separators[idx] + 2
+                continue
+        
+        batches.append((start_idx, end_idx, text[start_idx:end_idx]))
+        start_idx = end_idx
+    
+    return batches
+
+
+def _gemini_batch_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore capping concurrent Gemini batch requests in this process."""
+    global _batch_semaphore
+    if _batch_semaphore is None:
+        _batch_semaphore = asyncio.Semaphore(settings.GEMINI_CONCURRENT_BATCHES)
+    return _batch_semaphore
+
+
 async def _analyze_sentiment_batch_processing(
+    client: genai_new.Client,
     model_name: str, 
+    generate_config: types.GenerateContentConfig,
     scrape_results: list, 
     toon_text: str, 
     data_summary: dict, 
-    product_name: str = ""
+    product_name: str = "",
+    google_urls: Optional[List[str]] = None
 ) -> Dict[str, Any]:
-    """Handle large datasets by processing in batches."""
+    """Handle large datasets by processing batches concurrently."""
     logger.info(f"[Gemini] Processing large dataset in batches...")
     
-    client, model_name, generate_config = create_gemini_client_with_tools()
-    google_urls = extract_google_search_urls(scrape_results, max_urls=15)
+    if google_urls is None:
+        google_urls = extract_google_search_urls(scrape_results, max_urls=15)
     
-    combined_text = toon_text
-    total_size = len(combined_text)
+    total_size = len(toon_text)
     logger.info(f"[Gemini] Total TOON text size: {total_size:,} characters (~{total_size // 4:,} tokens)")
     
-    MAX_CHARS_PER_BATCH = 600000
-    batch_results = []
-    
-    batch_num = 1
-    start_idx = 0
-    
-    while start_idx < total_size:
-        end_idx = min(start_idx + MAX_CHARS_PER_BATCH, total_size)
-        batch_text = combined_text[start_idx:end_idx]
-        
-        if end_idx < total_size and batch_text:
-            last_section_sep = batch_text.rfind("\n\n")
-            if last_section_sep > MAX_CHARS_PER_BATCH * 0.8:
-                batch_text = batch_text[:last_section_sep]
-                end_idx = start_idx + last_section_sep + 2
-        
+    async def run_batch(batch_num: int, start_idx: int, end_idx: int, batch_text: str) -> Optional[Dict[str, Any]]:
         batch_info = f"Batch {batch_num} (text chars {start_idx:,} to {end_idx:,} of {total_size:,})"
         
         urls_section = ""
@@ -232,41 +300,26 @@ Include findings from social media in your analysis.
                 )
             ]
             
-            loop = asyncio.get_event_loop()
+            async with _gemini_batch_semaphore():
+                response_text = await _stream_with_backoff(client, model_name, contents, generate_config)
             
-            def generate_content():
-                response_text = ""
-                for chunk in client.models.generate_content_stream(
-                    model=model_name,
-                    contents=contents,
-                    config=generate_config,
-                ):
-                    if hasattr(chunk, 'text') and chunk.text:
-                        response_text += chunk.text
-                return response_text
-            
-            response_text = await loop.run_in_executor(None, generate_content)
-            response_text = response_text.strip()
-            
-            batch_result = {
-                "toon_text": response_text,
+            logger.info(f"[Gemini] Processed {batch_info} ({len(batch_text):,} chars)")
+            return {
+                "toon_text": response_text.strip(),
                 "batch_info": batch_info,
                 "chars_processed": len(batch_text)
             }
-            batch_results.append(batch_result)
-            logger.info(f"[Gemini] Processed {batch_info} ({len(batch_text):,} chars)")
-            
-            start_idx = end_idx
-            batch_num += 1
-            
-            if start_idx < total_size:
-                logger.info(f"[Gemini] Waiting 7 seconds to avoid rate limit...")
-                await asyncio.sleep(7)
                 
         except Exception as e:
             logger.error(f"[Gemini] Failed at batch {batch_num}: {e}")
-            start_idx = end_idx
-            batch_num += 1
+            return None
+    
+    # Batches run concurrently within the Gemini batch limit; gather keeps them in order
+    results = await asyncio.gather(*(
+        run_batch(batch_num, start_idx, end_idx, batch_text)
+        for batch_num, (start_idx, end_idx, batch_text) in enumerate(_split_batches(toon_text), start=1)
+    ))
+    batch_results = [result for result in results if result is not None]
     
     aggregated = _aggregate_batch_results(batch_results, scrape_results, data_summary)
     return aggregated
@@ -280,28 +333,26 @@ def _aggregate_batch_results(
     """Aggregate results from multiple batches."""
     logger.info(f"[Gemini] Aggregating results from {len(batch_results)} batches...")
     
-    combined_toon = []
-    header_added = False
-    
-    for batch in batch_results:
-        toon_text = batch.get("toon_text", "")
-        lines = toon_text.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            if 'type' in line.lower() and 'category' in line.lower() and 'title' in line.lower():
-                if not header_added:
-                    combined_toon.append(line)
-                    header_added = True
-                continue
-            
-            combined_toon.append(line)
+    def combined_rows():
+        # Non-blank rows of every batch, keeping only the first header line
+        header_added = False
+        for batch in batch_results:
+            for line in batch.get("toon_text", "").split('\n'):
+                line = line.strip()
+                if not line:
+                    continue
+                
+                if is_toon_header(line):
+                    if not header_added:
+                        header_added = True
+                        yield line
+                    continue
+                
+                yield line
     
-    combined_toon_text = '\n'.join(combined_toon)
-    logger.info(f"[Gemini] Combined TOON text: {len(combined_toon)} lines")
+    combined_toon_text = '\n'.join(combined_rows())
+    line_count = combined_toon_text.count('\n') + 1 if combined_toon_text else 0
+    logger.info(f"[Gemini] Combined TOON text: {line_count} lines")
     
     analysis = parse_toon_findings(combined_toon_text, scrape_results, data_summary)
     
@@ -341,21 +392,18 @@ def _aggregate_batch_results(
     }
 
 
-def _build_analysis_prompt(
-    combined_text: str, 
-    urls_section: str, 
-    social_search_instruction: str, 
-    product_name: str
-) -> str:
-    """Build the main analysis prompt."""
-    return f"""You are an expert app analyst specializing in user feedback analysis.
+# Fixed parts of the analysis prompts, built once; the scraped data and the
+# per-request sections are joined in between at call time
+_ANALYSIS_PROMPT_INTRO = """You are an expert app analyst specializing in user feedback analysis.
 
 CRITICAL: Output ONLY in TOON (pipe-delimited) format. NO JSON, NO markdown, just the TOON table.
 
 TASKS:
 1. Analyze ALL reviews and discussions from all provided sources
 2. Visit and analyze the Google Search URLs using your URL context tool to extract full review content
-3. {f'Search social media for "{product_name} review" to gather additional user feedback' if product_name else 'Use only the provided data'}
+3. """
+
+_ANALYSIS_PROMPT_RULES = """
 4. Categorize EVERY finding into exactly ONE of these 7 types:
    - bug: Technical issues, crashes, errors, broken features
    - feature_request: User-requested new features or enhancements
@@ -380,29 +428,19 @@ FORMATTING RULES:
 - sources: reddit, google_play_store, apple_app_store, google_search, or social_media
 
 SCRAPED DATA FROM ALL SOURCES (TOON format):
-{combined_text}
-{urls_section}
-{social_search_instruction}
-
-Remember: Output ONLY the TOON table (header + data rows). NO JSON, NO markdown."""
+"""
 
+_ANALYSIS_PROMPT_OUTRO = "\n\nRemember: Output ONLY the TOON table (header + data rows). NO JSON, NO markdown."
 
-def _build_batch_prompt(
-    batch_text: str, 
-    urls_section: str, 
-    social_search: str, 
-    product_name: str, 
-    batch_info: str
-) -> str:
-    """Build the batch analysis prompt."""
-    return f"""You are an expert app analyst. Analyze reviews and categorize findings into 7 types.
+_BATCH_PROMPT_INTRO = """You are an expert app analyst. Analyze reviews and categorize findings into 7 types.
 
 CRITICAL: Output ONLY in TOON (pipe-delimited) format. NO JSON, NO markdown.
 
 TASKS:
 1. Analyze all provided text data
-2. {f'Visit and analyze the Google Search URLs using your URL context tool' if urls_section else 'Continue analysis'}
-3. {f'Search social media for "{product_name} review"' if social_search else 'Continue analysis'}
+2. """
+
+_BATCH_PROMPT_RULES = """
 4. Categorize findings into: bug, feature_request, requirement, usability_friction, pain_point, positive_review, ai_insight
 5. Generate AI insights by cross-referencing sources
 
@@ -415,9 +453,47 @@ FORMATTING RULES:
 - severity: critical, high, medium, or low
 - priority_score: 1-10
 
-{batch_info}
-{batch_text}
-{urls_section}
-{social_search}
+"""
+
+_BATCH_PROMPT_OUTRO = "\n\nOutput ONLY the TOON table (header + data rows). NO JSON, NO markdown, NO explanations."
+
+
+def _build_analysis_prompt(
+    combined_text: str, 
+    urls_section: str, 
+    social_search_instruction: str, 
+    product_name: str
+) -> str:
+    """Build the main analysis prompt."""
+    social_task = (
+        f'Search social media for "{product_name} review" to gather additional user feedback'
+        if product_name else 'Use only the provided data'
+    )
+    return "".join([
+        _ANALYSIS_PROMPT_INTRO, social_task,
+        _ANALYSIS_PROMPT_RULES, combined_text,
+        "\n", urls_section,
+        "\n", social_search_instruction,
+        _ANALYSIS_PROMPT_OUTRO
+    ])
+
 
-Output ONLY the TOON table (header + data rows). NO JSON, NO markdown, NO explanations."""
+def _build_batch_prompt(
+    batch_text: str, 
+    urls_section: str, 
+    social_search: str, 
+    product_name: str, 
+    batch_info: str
+) -> str:
+    """Build the batch analysis prompt."""
+    urls_task = 'Visit and analyze the Google Search URLs using your URL context tool' if urls_section else 'Continue analysis'
+    social_task = f'Search social media for "{product_name} review"' if social_search else 'Continue analysis'
+    return "".join([
+        _BATCH_PROMPT_INTRO, urls_task,
+        "\n3. ", social_task,
+        _BATCH_PROMPT_RULES, batch_info,
+        "\n", batch_text,
+        "\n", urls_section,
+        "\n", social_search,
+        _BATCH_PROMPT_OUTRO
+    ])
@@ -1,5 +1,18 @@
 """Helper functions."""
+import random
 import re
+from typing import Any, List, Optional
+
+import msgspec
+import orjson
+from fastapi.responses import JSONResponse
+
+
+# Control characters stripped from model output; newline, tab and carriage return are kept
+_CONTROL_CHAR_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f])
+
+# Markdown code block, optionally tagged json
+_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
 
 
 def clean_json_response(response_text: str) -> str:
@@ -8,10 +21,10 @@ def clean_json_response(response_text: str) -> str:
         return "{}"
     
     # Remove control characters except newline, tab, carriage return
-    response_text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', response_text)
+    response_text = response_text.translate(_CONTROL_CHAR_TABLE)
     
     # Remove markdown code blocks
-    json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', response_text)
+    json_match = _CODE_BLOCK_RE.search(response_text)
     if json_match:
         response_text = json_match.group(1)
     
@@ -25,8 +38,73 @@ def clean_json_response(response_text: str) -> str:
     return response_text.strip()
 
 
+# Characters that would break a TOON row, mapped to spaces
+_PIPE_TEXT_TABLE = str.maketrans({"|": " ", "\n": " ", "\r": " "})
+
+# Joins a column for batch sanitizing; must not be a character in _PIPE_TEXT_TABLE
+_COLUMN_SEPARATOR = "\x00"
+
+
 def sanitize_pipe_text(text: str) -> str:
     """Replace pipe characters and newlines for TOON format."""
     if not text:
         return ""
-    return str(text).replace("|", " ").replace("\n", " ").replace("\r", " ")
+    return str(text).translate(_PIPE_TEXT_TABLE)
+
+
+def sanitize_pipe_column(values: List[str]) -> List[str]:
+    """Sanitize a column of strings for TOON format in a single translate pass."""
+    joined = _COLUMN_SEPARATOR.join(values)
+    
+    # A value containing the separator would shift the split; fall back per value
+    if joined.count(_COLUMN_SEPARATOR) != max(len(values) - 1, 0):
+        return [sanitize_pipe_text(value) for value in values]
+    
+    return joined.translate(_PIPE_TEXT_TABLE).split(_COLUMN_SEPARATOR) if values else []
+
+
+# Upstream statuses that mean "slow down and retry"
+RETRYABLE_STATUS_CODES = frozenset({429, 503})
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None, cap: float = 60.0) -> float:
+    """
+    Seconds to wait before retrying after a rate-limited attempt.
+    
+    Honors a numeric Retry-After value; otherwise uses full-jitter
+    exponential backoff so concurrent retries spread out.
+    
+    Args:
+        attempt: Zero-based number of the attempt that failed
+        retry_after: Retry-After header value, if the server sent one
+        cap: Maximum delay in seconds
+    """
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, 2 ** attempt))
+
+
+def json_dumps(data: Any) -> str:
+    """Serialize to a compact JSON string using orjson."""
+    return orjson.dumps(data).decode("utf-8")
+
+
+def json_loads(data: str | bytes) -> Any:
+    """Deserialize a JSON string using orjson."""
+    return orjson.loads(data)
+
+
+class MsgspecJSONResponse(JSONResponse):
+    """JSON response encoded with msgspec's C encoder.
+    
+    Returning it from an endpoint skips FastAPI's response_model
+    validation, so use it only for content that is already well formed.
+    """
+    
+    _encoder = msgspec.json.Encoder()
+    
+    def render(self, content: Any) -> bytes:
+        return self._encoder.encode(content)
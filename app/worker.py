@@ -0,0 +1,230 @@
+"""arq worker that runs scrape tasks outside the API process.
+
+Start with: arq app.worker.WorkerSettings
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+from arq import func
+
+from app.config import get_settings
+from app.logging_config import setup_logging, stop_logging, get_logger
+from app.core.redis_store import RedisTaskStore
+from app.core.http_client import get_http_client, close_http_client
+from app.core.task_queue import SCRAPE_JOB, get_redis_settings
+from app.models.requests import MultiSourceScrapeRequest
+from app.models.responses import TaskStatus
+from app.services.google_play import scrape_google_play_reviews
+from app.services.apple_store import scrape_apple_store_reviews
+from app.services.reddit import scrape_reddit
+from app.services.google_search import scrape_google_search
+from app.services.sentiment import analyze_sentiment_with_gemini
+from app.services.data_processor import build_gemini_query
+
+
+setup_logging()
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def _reddit_scraper(request: MultiSourceScrapeRequest, client: httpx.AsyncClient) -> Awaitable[Any]:
+    """Build the Reddit scrape, falling back to the product name as keyword."""
+    keyword = request.reddit.keyword if request.reddit else request.product_name
+    limit_pages = request.reddit.limit_pages if request.reddit else 2
+    return scrape_reddit(keyword, limit_pages, client=client)
+
+
+def _google_search_scraper(request: MultiSourceScrapeRequest, client: httpx.AsyncClient) -> Awaitable[Any]:
+    """Build the Google Search scrape, falling back to the request's product name."""
+    product_name = request.google_search.product_name if request.google_search else request.product_name
+    return scrape_google_search(product_name, client=client)
+
+
+# Scraper coroutine factories keyed by the source names chosen in start_scrape
+_SCRAPERS: Dict[str, Callable[[MultiSourceScrapeRequest, httpx.AsyncClient], Awaitable[Any]]] = {
+    "google_play_store": lambda request, client: scrape_google_play_reviews(
+        request.google_play.product_id,
+        request.google_play.platform,
+        client=client
+    ),
+    "apple_app_store": lambda request, client: scrape_apple_store_reviews(
+        request.apple_store.product_id,
+        request.apple_store.country,
+        request.apple_store.target_reviews,
+        client=client
+    ),
+    "reddit": _reddit_scraper,
+    "google_search": _google_search_scraper,
+}
+
+
+async def _tagged(source: str, coro: Awaitable[Any]) -> Tuple[str, Any]:
+    """Await a scraper and tag its result (or exception) with the source name."""
+    try:
+        return source, await coro
+    except Exception as e:
+        return source, e
+
+
+async def _run_scrape_task(
+    task_id: str,
+    request: MultiSourceScrapeRequest,
+    sources: List[str],
+    store: RedisTaskStore
+) -> None:
+    """Run multi-source scraping and sentiment analysis for a task."""
+    http_client = get_http_client()
+    
+    try:
+        await store.update_task_status(
+            task_id, 
+            TaskStatus.RUNNING, 
+            progress=5, 
+            message="Starting scrapers..."
+        )
+        
+        tasks_to_run = [
+            (source, _SCRAPERS[source](request, http_client))
+            for source in sources
+            if source in _SCRAPERS
+        ]
+        
+        if not tasks_to_run:
+            await store.set_task_error(task_id, "No sources configured for scraping")
+            return
+        
+        await store.update_task_status(
+            task_id,
+            TaskStatus.RUNNING,
+            progress=10,
+            message=f"Scraping {len(tasks_to_run)} sources: {', '.join(source for source, _ in tasks_to_run)}"
+        )
+        
+        # Run all scrapers concurrently, reporting each one as soon as it finishes
+        results = {}
+        pending = [_tagged(source, coro) for source, coro in tasks_to_run]
+        for done, future in enumerate(asyncio.as_completed(pending), start=1):
+            source, result = await future
+            results[source] = result
+            await store.update_task_status(
+                task_id,
+                TaskStatus.RUNNING,
+                progress=10 + 40 * done // len(pending),
+                message=f"Finished {source} ({done}/{len(pending)} sources)"
+            )
+        
+        # Restore the configured source order
+        ordered = [(source, results[source]) for source, _ in tasks_to_run]
+        
+        for source, result in ordered:
+            if isinstance(result, Exception):
+                logger.error(f"Error in scraper {source}: {result}")
+        
+        # Keep results that carry scraped data
+        scrape_results = [
+            result for _, result in ordered
+            if not isinstance(result, Exception) and result and len(result) >= 4 and result[-2]
+        ]
+        
+        if not scrape_results:
+            await store.set_task_error(task_id, "No valid results from any scraper")
+            return
+        
+        await store.update_task_status(
+            task_id,
+            TaskStatus.RUNNING,
+            progress=50,
+            message=f"Scraped {len(scrape_results)} sources. Running sentiment analysis..."
+        )
+        
+        # Build combined query
+        combined_query, data_summary = build_gemini_query(scrape_results)
+        
+        if not combined_query:
+            await store.set_task_error(task_id, "Failed to build query from scraped data")
+            return
+        
+        await store.update_task_status(
+            task_id,
+            TaskStatus.RUNNING,
+            progress=60,
+            message="Analyzing sentiment with Gemini AI..."
+        )
+        
+        # Run sentiment analysis
+        sentiment_result = await analyze_sentiment_with_gemini(
+            combined_query,
+            data_summary,
+            scrape_results,
+            request.product_name
+        )
+        
+        if sentiment_result.get("error"):
+            await store.set_task_error(task_id, sentiment_result["error"])
+            return
+        
+        await store.update_task_status(
+            task_id,
+            TaskStatus.RUNNING,
+            progress=95,
+            message="Saving results..."
+        )
+        
+        # Store result
+        await store.set_task_result(task_id, sentiment_result)
+        
+        await store.update_task_status(
+            task_id,
+            TaskStatus.COMPLETED,
+            progress=100,
+            message="Analysis complete!"
+        )
+        
+        logger.info(f"Task {task_id} completed successfully")
+        
+    except asyncio.CancelledError:
+        # arq cancels jobs that overrun job_timeout; record a final state so
+        # pollers and WebSocket clients are not left waiting on "running"
+        logger.error(f"Task {task_id} timed out or was cancelled")
+        await asyncio.shield(store.set_task_error(task_id, "Task timed out or was cancelled"))
+        raise
+    except Exception as e:
+        logger.error(f"Task {task_id} failed: {e}", exc_info=True)
+        await store.set_task_error(task_id, str(e))
+
+
+async def run_scrape_task(
+    ctx: Dict[str, Any],
+    task_id: str,
+    request_data: Dict[str, Any],
+    sources: List[str]
+) -> None:
+    """arq job: run the scrape pipeline for a task created by the API."""
+    request = MultiSourceScrapeRequest.model_validate(request_data)
+    await _run_scrape_task(task_id, request, sources, ctx["store"])
+
+
+async def startup(ctx: Dict[str, Any]) -> None:
+    """Connect the worker to Redis and open the shared HTTP client."""
+    ctx["store"] = await RedisTaskStore.get_instance()
+    get_http_client()
+
+
+async def shutdown(ctx: Dict[str, Any]) -> None:
+    """Close the worker's Redis and HTTP connections."""
+    await close_http_client()
+    await ctx["store"].disconnect()
+    stop_logging()
+
+
+class WorkerSettings:
+    """arq worker configuration."""
+    functions = [func(run_scrape_task, name=SCRAPE_JOB)]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = get_redis_settings()
+    max_jobs = settings.WORKER_MAX_JOBS
+    job_timeout = settings.WORKER_JOB_TIMEOUT_SECONDS
+    # Scrapes are billed per call; failures are reported on the task instead of retried
+    max_tries = 1
@@ -124,7 +124,9 @@ export interface ProgressUpdate {
   progress: number;
   total: number;
   message: string;
-  timestamp: string;
+  timestamp: number; // Unix epoch seconds
+  error?: string;
+  result_available?: boolean;
 }
 
 // Prioritization Response (matching backend PrioritizationPlan)
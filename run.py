@@ -14,7 +14,15 @@ def main():
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
-        log_level="info"
+        log_level="info",
+        # libuv event loop and C HTTP parser (both installed with uvicorn[standard]);
+        # set explicitly so a missing extra fails at startup instead of silently
+        # falling back to the pure-Python implementations
+        loop="uvloop",
+        http="httptools",
+        # WebSocket keepalive via protocol ping frames
+        ws_ping_interval=20.0,
+        ws_ping_timeout=20.0
     )
 
 
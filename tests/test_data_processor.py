@@ -0,0 +1,22 @@
+"""Tests for TOON findings parsing."""
+import csv
+
+from app.services.data_processor import parse_toon_findings
+
+
+HEADER = "type|category|title|description|frequency|severity|sample_reviews|recommendation|priority_score|sources"
+
+
+def test_parse_toon_findings_skips_row_over_csv_field_limit():
+    oversized = "x" * (csv.field_size_limit() + 1)
+    toon_text = "\n".join([
+        HEADER,
+        f"bug|performance|Slow startup|{oversized}|3|high|[]|Profile startup|8|google_play_store",
+        "feature_request|ui|Dark mode|Users want a dark theme|5|medium|[]|Add dark mode|6|reddit",
+    ])
+    
+    analysis = parse_toon_findings(toon_text, [], {})
+    
+    assert analysis is not None
+    assert analysis["summary_counts"]["bugs"] == 0
+    assert [f["title"] for f in analysis["feature_requests"]] == ["Dark mode"]